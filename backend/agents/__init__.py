@@ -1,3 +1,3 @@
-from agents.workflow import run_neighborhood_workflow
+from agents.workflow import run_neighborhood_workflow, stream_neighborhood_workflow, get_workflow_session_count
 
-__all__ = ["run_neighborhood_workflow"]
+__all__ = ["run_neighborhood_workflow", "stream_neighborhood_workflow", "get_workflow_session_count"]
@@ -0,0 +1,98 @@
+import os
+import math
+from typing import List, Sequence
+
+import numpy as np
+
+from services.geo import haversine_m, haversine_matrix
+
+# Camera cruise speed between POIs; hop durations follow distance within these bounds
+FLIGHT_SPEED_MPS = float(os.getenv("FLIGHT_SPEED_MPS", "350"))
+MIN_HOP_SECONDS = 1.5
+MAX_HOP_SECONDS = 6.0
+# 2-opt passes over the whole tour; each pass is vectorized over one endpoint
+MAX_TWO_OPT_PASSES = 50
+
+
+def hop_duration(distance_m: float) -> float:
+    """Seconds to fly `distance_m`: a fixed ease-in/out plus cruise time, clamped to a watchable range."""
+    return round(min(MAX_HOP_SECONDS, max(MIN_HOP_SECONDS, 1.0 + distance_m / FLIGHT_SPEED_MPS)), 2)
+
+
+def compute_heading(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Compute compass heading from point 1 to point 2 in degrees."""
+    lat1_r, lat2_r = math.radians(lat1), math.radians(lat2)
+    dlng = math.radians(lng2 - lng1)
+    x = math.sin(dlng) * math.cos(lat2_r)
+    y = math.cos(lat1_r) * math.sin(lat2_r) - math.sin(lat1_r) * math.cos(lat2_r) * math.cos(dlng)
+    heading = math.degrees(math.atan2(x, y))
+    return (heading + 360) % 360
+
+
+def tour_length(order: Sequence[int], distances: np.ndarray) -> float:
+    """Length of the closed tour visiting `order` and returning to its first node."""
+    order = np.asarray(order)
+    return float(distances[order, np.roll(order, -1)].sum())
+
+
+def nearest_neighbor_tour(distances: np.ndarray, start: int = 0) -> List[int]:
+    """Greedy tour from `start`, always flying to the closest unvisited point."""
+    n = len(distances)
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    order = [start]
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, distances[order[-1]])
+        nxt = int(row.argmin())
+        visited[nxt] = True
+        order.append(nxt)
+    return order
+
+
+def two_opt(order: Sequence[int], distances: np.ndarray) -> List[int]:
+    """Uncrosses a closed tour by segment reversal until no reversal shortens it; node 0 stays first.
+
+    For each edge (a, b) every candidate second edge (c, d) is scored in one array operation.
+    """
+    tour = np.asarray(order)
+    n = len(tour)
+    if n < 4:
+        return tour.tolist()
+    for _ in range(MAX_TWO_OPT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            c = tour[i + 1:]
+            d = np.roll(tour, -1)[i + 1:]
+            delta = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+            j = int(delta.argmin())
+            if delta[j] < -1e-9:
+                end = i + 1 + j
+                tour[i:end + 1] = tour[i:end + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return tour.tolist()
+
+
+def tour_flight_seconds(origin_lat: float, origin_lng: float, lats: Sequence[float], lngs: Sequence[float], order: Sequence[int]) -> float:
+    """Total hop flight time for visiting POIs in `order` from the origin and back."""
+    path_lats = [origin_lat, *(lats[i] for i in order), origin_lat]
+    path_lngs = [origin_lng, *(lngs[i] for i in order), origin_lng]
+    return sum(
+        hop_duration(haversine_m(path_lats[k], path_lngs[k], path_lats[k + 1], path_lngs[k + 1]))
+        for k in range(len(path_lats) - 1)
+    )
+
+
+def optimize_visit_order(origin_lat: float, origin_lng: float, lats: Sequence[float], lngs: Sequence[float]) -> List[int]:
+    """Orders POIs for a round trip from the origin that minimizes total flight distance.
+
+    Returns indices into `lats`/`lngs`.
+    """
+    if len(lats) < 2:
+        return list(range(len(lats)))
+    distances = haversine_matrix([origin_lat, *lats], [origin_lng, *lngs])
+    tour = two_opt(nearest_neighbor_tour(distances, start=0), distances)
+    # Node 0 is the origin; shift the rest back to POI indices
+    return [node - 1 for node in tour[1:]]
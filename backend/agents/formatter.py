@@ -9,12 +9,11 @@ def create_formatter_agent() -> LlmAgent:
     return LlmAgent(
         name="FormatterAgent",
         model="gemini-2.5-flash",
-        instruction="""You are a strict JSON formatter. You will receive two pieces of data from the session state:
+        instruction="""You are a strict JSON formatter. Your input is a rich text narrative about a neighborhood:
 
-1. `raw_narrative` — A rich text narrative about a neighborhood
-2. `visualization_plan` — A camera flight plan with waypoints
+{raw_narrative?}
 
-Your job is to extract and structure ALL information from the raw_narrative into the exact NeighborhoodProfile JSON schema.
+Your job is to extract and structure ALL information from the narrative above into the exact NeighborhoodProfile JSON schema.
 
 Rules:
 - Extract real data from the narrative. Do NOT invent or hallucinate any information.
@@ -1,6 +1,6 @@
+import os
 import json
-import math
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List
 from google.adk.agents import BaseAgent, LlmAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.genai import types
@@ -8,7 +8,13 @@ from google.adk.events import Event
 from google.adk.events.event_actions import EventActions
 from agents.models import CameraWaypoint, VisualizationPlan, ExtractedPOI
 from agents.json_utils import parse_json_from_text
+from agents.poi_extractor import extract_pois, merge_pois, record_llm_fallback
+from agents.flight_path import optimize_visit_order, tour_flight_seconds, compute_heading, hop_duration
+from services.geo import haversine_m
+from services.gemini_client import generate_content
 
+# Fewer parsed POIs than this and the narrative is handed to the LLM extractor instead
+POI_MIN_DETERMINISTIC = int(os.getenv("POI_MIN_DETERMINISTIC", "3"))
 
 EXTRACT_POIS_INSTRUCTION = """You are a coordinate extraction specialist. Given a narrative text about a neighborhood, extract all specifically named places/POIs that include coordinates.
 
@@ -34,30 +40,13 @@ class GlobeControllerAgent(BaseAgent):
         origin_lat = ctx.session.state.get("origin_lat", 40.7128)
         origin_lng = ctx.session.state.get("origin_lng", -74.0060)
 
-        # 2. Extract POIs via internal LLM call
-        from google import genai
-        import os
+        # 2. Parse the `Name (lat, lng)` mentions ScriptWriter is instructed to embed
+        pois = extract_pois(raw_narrative, origin_lat, origin_lng)
 
-        client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-
-        extract_response = client.models.generate_content(
-            model=self.model,
-            contents=f"Extract POIs from this narrative:\n\n{raw_narrative}",
-            config=types.GenerateContentConfig(
-                temperature=0.1,
-                response_mime_type="application/json",
-                system_instruction=EXTRACT_POIS_INSTRUCTION,
-            ),
-        )
-
-        try:
-            pois_data = parse_json_from_text(extract_response.text)
-            if isinstance(pois_data, dict) and "pois" in pois_data:
-                pois_data = pois_data["pois"]
-            pois = [ExtractedPOI(**p) for p in pois_data[:8]]  # Cap at 8 POIs
-        except Exception as e:
-            print(f"POI extraction failed: {e}, using empty list")
-            pois = []
+        # Only a narrative that ignored the format pays for an extra LLM extraction call
+        if len(pois) < POI_MIN_DETERMINISTIC:
+            record_llm_fallback()
+            pois = merge_pois(pois, await self._extract_pois_with_llm(raw_narrative), origin_lat, origin_lng)
 
         # 3. Compute deterministic camera waypoints
         waypoints = []
@@ -75,10 +64,15 @@ class GlobeControllerAgent(BaseAgent):
             pause_after=2.0,
         ))
 
-        # Waypoints 1-N: POI Flyovers
-        for i, poi in enumerate(pois):
-            # Compute heading from origin to POI
-            heading = self._compute_heading(origin_lat, origin_lng, poi.latitude, poi.longitude)
+        # Waypoints 1-N: POI Flyovers, ordered as the shortest round trip from the origin
+        poi_lats = [p.latitude for p in pois]
+        poi_lngs = [p.longitude for p in pois]
+        order = optimize_visit_order(origin_lat, origin_lng, poi_lats, poi_lngs)
+        prev_lat, prev_lng = origin_lat, origin_lng
+        for poi in (pois[i] for i in order):
+            # Face the direction of travel; fly time follows hop distance
+            heading = compute_heading(prev_lat, prev_lng, poi.latitude, poi.longitude)
+            hop_m = haversine_m(prev_lat, prev_lng, poi.latitude, poi.longitude)
             waypoints.append(CameraWaypoint(
                 label=poi.name,
                 latitude=poi.latitude,
@@ -87,9 +81,10 @@ class GlobeControllerAgent(BaseAgent):
                 heading=heading,
                 pitch=-20,
                 roll=0,
-                duration=3.0,
+                duration=hop_duration(hop_m),
                 pause_after=1.5,
             ))
+            prev_lat, prev_lng = poi.latitude, poi.longitude
 
         # Final Waypoint: Return to origin at medium altitude
         waypoints.append(CameraWaypoint(
@@ -100,12 +95,19 @@ class GlobeControllerAgent(BaseAgent):
             heading=0,
             pitch=-35,
             roll=0,
-            duration=3.5,
+            duration=hop_duration(haversine_m(prev_lat, prev_lng, origin_lat, origin_lng)),
             pause_after=1.0,
         ))
 
-        total_duration = sum(wp.duration + wp.pause_after for wp in waypoints)
-        plan = VisualizationPlan(waypoints=waypoints, total_duration=total_duration)
+        total_duration = round(sum(wp.duration + wp.pause_after for wp in waypoints), 2)
+        # Savings from reordering alone: the same timing model flown in the order the POIs were listed
+        listed_seconds = tour_flight_seconds(origin_lat, origin_lng, poi_lats, poi_lngs, range(len(pois)))
+        optimized_seconds = tour_flight_seconds(origin_lat, origin_lng, poi_lats, poi_lngs, order)
+        plan = VisualizationPlan(
+            waypoints=waypoints,
+            total_duration=total_duration,
+            duration_saved=round(listed_seconds - optimized_seconds, 2),
+        )
 
         # 4. Store in session state via EventActions for proper ADK tracking
         plan_data = plan.model_dump()
@@ -121,12 +123,22 @@ class GlobeControllerAgent(BaseAgent):
             ),
         )
 
-    @staticmethod
-    def _compute_heading(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-        """Compute compass heading from point 1 to point 2 in degrees."""
-        lat1_r, lat2_r = math.radians(lat1), math.radians(lat2)
-        dlng = math.radians(lng2 - lng1)
-        x = math.sin(dlng) * math.cos(lat2_r)
-        y = math.cos(lat1_r) * math.sin(lat2_r) - math.sin(lat1_r) * math.cos(lat2_r) * math.cos(dlng)
-        heading = math.degrees(math.atan2(x, y))
-        return (heading + 360) % 360
+    async def _extract_pois_with_llm(self, raw_narrative: str) -> List[ExtractedPOI]:
+        """Extracts POIs via internal LLM call on the shared, bounded async client."""
+        try:
+            extract_response = await generate_content(
+                f"Extract POIs from this narrative:\n\n{raw_narrative}",
+                types.GenerateContentConfig(
+                    temperature=0.1,
+                    response_mime_type="application/json",
+                    system_instruction=EXTRACT_POIS_INSTRUCTION,
+                ),
+                model=self.model,
+            )
+            pois_data = parse_json_from_text(extract_response.text)
+            if isinstance(pois_data, dict) and "pois" in pois_data:
+                pois_data = pois_data["pois"]
+            return [ExtractedPOI(**p) for p in pois_data[:8]]  # Cap at 8 POIs
+        except Exception as e:
+            print(f"POI extraction failed: {e}, using empty list")
+            return []
@@ -4,11 +4,10 @@ import json
 from services.places_service import (
     get_autocomplete_predictions,
     get_places_details,
-    get_nearby_places,
     contextual_places_search,
 )
-from services.gemini_client import parse_contextual_intent
-from services.weather_service import fetch_weather_forecast
+from services.intent_service import get_intent_keywords
+from services.aggregation import aggregate_location_context
 from agents.workflow import run_neighborhood_workflow
 
 
@@ -34,22 +33,17 @@ async def search_neighborhood(place_query: str, intent: str = "general explorati
     if not place_id:
         return {"error": "Could not resolve place ID from autocomplete."}
 
-    # 2. Get full place details
-    location_details = await get_places_details(place_id)
-    if not location_details or not location_details.get("geometry"):
+    # 2-3. Get full place details, then nearby places and weather in parallel
+    context = await aggregate_location_context(place_id)
+    if context.get("status_code") == 404:
         return {"error": "Could not retrieve location details."}
-
-    lat = location_details["geometry"].get("location", {}).get("lat")
-    lng = location_details["geometry"].get("location", {}).get("lng")
-    if not lat or not lng:
+    if context.get("error"):
         return {"error": "Location geometry is invalid."}
 
-    # 3. Get nearby places and weather in parallel
-    import asyncio
-    nearby_places, weather = await asyncio.gather(
-        get_nearby_places(lat, lng),
-        fetch_weather_forecast(lat, lng),
-    )
+    location_details = context["location_details"]
+    lat, lng = context["lat"], context["lng"]
+    nearby_places = context["nearby_places"]
+    weather = context["weather"]
 
     # 4. Run the full agent workflow
     try:
@@ -104,8 +98,8 @@ async def get_recommendations(place_query: str, intent: str, radius: float = 0.4
 
     # 2. Parse intent into keywords
     try:
-        intent_parsed = await parse_contextual_intent(intent)
-        keywords = intent_parsed.get("keywords", [intent])
+        intent_parsed = await get_intent_keywords(intent)
+        keywords = intent_parsed.get("keywords") or [intent]
     except Exception:
         keywords = [intent]
 
@@ -17,6 +17,7 @@ class CameraWaypoint(BaseModel):
 class VisualizationPlan(BaseModel):
     waypoints: List[CameraWaypoint]
     total_duration: float = Field(..., description="Sum of all waypoint durations and pauses.")
+    duration_saved: float = Field(0.0, description="Seconds of flight saved versus visiting the POIs in the order they were listed.")
 
 
 class ExtractedPOI(BaseModel):
@@ -0,0 +1,112 @@
+import os
+import re
+from typing import List
+
+from agents.models import ExtractedPOI
+from services.geo import haversine_m
+
+# Narrative POIs farther than this from the neighborhood origin are treated as mis-parsed or hallucinated
+POI_MAX_DISTANCE_M = float(os.getenv("POI_MAX_DISTANCE_M", "15000"))
+# Two mentions closer than this are the same place
+POI_DUPLICATE_DISTANCE_M = 15.0
+MAX_POIS = 8
+
+# ScriptWriter embeds places as `Name (lat, lng)`, e.g. "Blue Bottle Coffee (34.0522, -118.2437)".
+# A name is up to eight words starting with a capitalized word; connector words may appear inside,
+# but not at/in/on, which in "Smorgasburg at East River State Park" introduce the place the coordinates belong to.
+_NAME_WORD = r"[A-Z0-9][\w&'’.\-]*"
+_CONNECTOR = r"(?:of|the|and|de|la|le|du|del|di|da|y|&)"
+_POI_PATTERN = re.compile(
+    rf"(?P<name>{_NAME_WORD}(?:[ \t]+(?:{_NAME_WORD}|{_CONNECTOR})){{0,7}})"
+    r"[ \t]*\([ \t]*(?P<lat>[-+]?\d{1,2}(?:\.\d+)?)[ \t]*°?[ \t]*(?P<ns>[NS])?"
+    r"[ \t]*,[ \t]*(?P<lng>[-+]?\d{1,3}(?:\.\d+)?)[ \t]*°?[ \t]*(?P<ew>[EW])?[ \t]*\)"
+)
+# Leading words the name pattern picks up that are never part of a place name, compared case-insensitively
+_LEADING_NOISE = {
+    "at", "in", "on", "from", "near", "visit", "try", "grab", "head", "stop", "by", "and", "then",
+    "while", "nearby", "meanwhile", "also", "the", "a", "an",
+}
+_SENTENCE_END = re.compile(r"[.!?\n]")
+
+_extraction_stats = {"narratives_parsed": 0, "llm_fallbacks": 0, "rejected_coordinates": 0}
+
+
+def _clean_name(raw: str) -> str:
+    words = raw.split()
+    while words and words[0].lower() in _LEADING_NOISE:
+        words = words[1:]
+    # A name cannot end on a connector ("Museum of")
+    while words and re.fullmatch(_CONNECTOR, words[-1]):
+        words = words[:-1]
+    return " ".join(words).strip(" .,'’-")
+
+
+def _relevance(text: str, start: int, end: int) -> str:
+    """The sentence around a mention, which is why the narrative brought the place up."""
+    before = [m.end() for m in _SENTENCE_END.finditer(text, 0, start)]
+    sentence_start = before[-1] if before else 0
+    after = _SENTENCE_END.search(text, end)
+    sentence = text[sentence_start:after.end() if after else len(text)].strip()
+    return sentence[:160] or "Mentioned in the neighborhood narrative."
+
+
+def is_plausible_poi(latitude: float, longitude: float, origin_lat: float, origin_lng: float) -> bool:
+    """Coordinates are valid, not the null island placeholder, and within reach of the origin."""
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+        return False
+    if latitude == 0 and longitude == 0:
+        return False
+    return haversine_m(origin_lat, origin_lng, latitude, longitude) <= POI_MAX_DISTANCE_M
+
+
+def merge_pois(pois: List[ExtractedPOI], extra: List[ExtractedPOI], origin_lat: float, origin_lng: float) -> List[ExtractedPOI]:
+    """Appends plausible POIs from `extra` that are not already in `pois`, keeping the cap."""
+    merged = list(pois)
+    for poi in extra:
+        if len(merged) >= MAX_POIS:
+            break
+        if not is_plausible_poi(poi.latitude, poi.longitude, origin_lat, origin_lng):
+            _extraction_stats["rejected_coordinates"] += 1
+            continue
+        duplicate = any(
+            poi.name.lower() == seen.name.lower()
+            or haversine_m(poi.latitude, poi.longitude, seen.latitude, seen.longitude) < POI_DUPLICATE_DISTANCE_M
+            for seen in merged
+        )
+        if not duplicate:
+            merged.append(poi)
+    return merged
+
+
+def extract_pois(narrative: str, origin_lat: float, origin_lng: float) -> List[ExtractedPOI]:
+    """Parses `Name (lat, lng)` mentions out of a narrative without an LLM call, in order of appearance."""
+    text = narrative.replace("*", "")
+    found = []
+    for match in _POI_PATTERN.finditer(text):
+        name = _clean_name(match.group("name"))
+        if not name:
+            continue
+        latitude = float(match.group("lat"))
+        longitude = float(match.group("lng"))
+        if match.group("ns") == "S":
+            latitude = -abs(latitude)
+        if match.group("ew") == "W":
+            longitude = -abs(longitude)
+        found.append(ExtractedPOI(
+            name=name,
+            latitude=latitude,
+            longitude=longitude,
+            relevance=_relevance(text, match.start(), match.end()),
+        ))
+    pois = merge_pois([], found, origin_lat, origin_lng)
+    _extraction_stats["narratives_parsed"] += 1
+    return pois
+
+
+def record_llm_fallback():
+    _extraction_stats["llm_fallbacks"] += 1
+
+
+def get_poi_extraction_metrics() -> dict:
+    """How often POIs came from the parser alone vs. needed the LLM, for the metrics endpoint."""
+    return dict(_extraction_stats)
@@ -1,27 +1,67 @@
+import os
 import json
-from google.adk.agents import SequentialAgent
+import asyncio
+from google.adk.agents import SequentialAgent, ParallelAgent
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
 
 from agents.script_writer import create_script_writer_agent
 from agents.globe_controller import GlobeControllerAgent
 from agents.formatter import create_formatter_agent
 from agents.json_utils import parse_json_from_text
+from services.session_store import create_session_service
 
 
 def _build_sequential_agent() -> SequentialAgent:
-    """Builds the 3-agent sequential workflow."""
+    """Builds the workflow: ScriptWriter, then GlobeController and Formatter concurrently.
+
+    Both second-stage agents only read `raw_narrative` (and the origin), and write disjoint
+    state keys, so the waypoint plan and the formatted profile are produced side by side.
+    """
     return SequentialAgent(
         name="NeighborhoodNarrativeAgent",
         sub_agents=[
             create_script_writer_agent(),
-            GlobeControllerAgent(name="GlobeControllerAgent"),
-            create_formatter_agent(),
+            ParallelAgent(
+                name="PlanAndFormatAgent",
+                sub_agents=[
+                    GlobeControllerAgent(name="GlobeControllerAgent"),
+                    create_formatter_agent(),
+                ],
+            ),
         ],
     )
 
 
+APP_NAME = "poview"
+USER_ID = "poview_user"
+# Caps live workflow sessions; each is deleted once its state has been read
+WORKFLOW_MAX_SESSIONS = int(os.getenv("WORKFLOW_MAX_SESSIONS", "64"))
+
+_runner = None
+_session_service = None
+_session_slots = asyncio.Semaphore(WORKFLOW_MAX_SESSIONS)
+# Sessions this process has open; counted here since a shared backend also holds other workers' sessions
+_active_sessions = 0
+
+
+def get_workflow_runner():
+    """Returns the process-wide (runner, session_service), building the agent pipeline on first use.
+
+    The agents are stateless between invocations; everything request-specific lives in the session.
+    """
+    global _runner, _session_service
+    if _runner is None:
+        _session_service = create_session_service()
+        _runner = Runner(
+            agent=_build_sequential_agent(),
+            app_name=APP_NAME,
+            session_service=_session_service,
+        )
+    return _runner, _session_service
+
+
 async def run_neighborhood_workflow(
     place_id: str,
     location_details: dict,
@@ -33,6 +73,33 @@ async def run_neighborhood_workflow(
 
     Returns: { "profile_data": dict, "visualization_plan": dict }
     """
+    result = None
+    async for update in stream_neighborhood_workflow(
+        place_id, location_details, nearby_places, weather, intent, stream_narrative=False
+    ):
+        if update["type"] == "result":
+            result = update
+    return {
+        "profile_data": result["profile_data"],
+        "visualization_plan": result["visualization_plan"],
+    }
+
+
+async def stream_neighborhood_workflow(
+    place_id: str,
+    location_details: dict,
+    nearby_places: list,
+    weather: dict,
+    intent: str = None,
+    stream_narrative: bool = True,
+):
+    """Runs the workflow, yielding progress as each agent produces it.
+
+    Yields, in order:
+      {"type": "narrative", "text": str}            ScriptWriter text (chunks when stream_narrative)
+      {"type": "visualization_plan", "plan": dict}  as soon as GlobeController's state_delta lands
+      {"type": "result", "profile_data": dict, "visualization_plan": dict}
+    """
     # Extract coordinates
     lat = location_details.get("geometry", {}).get("location", {}).get("lat", 0)
     lng = location_details.get("geometry", {}).get("location", {}).get("lng", 0)
@@ -63,48 +130,55 @@ Current Weather: {weather_summary}
 Nearby Places:
 {nearby_text}"""
 
-    # Build and run the agent pipeline
-    agent = _build_sequential_agent()
-    session_service = InMemorySessionService()
-
-    session = await session_service.create_session(
-        app_name="poview",
-        user_id="poview_user",
-        state={
-            "origin_lat": lat,
-            "origin_lng": lng,
-            "context_payload": context_payload,
-            "weather_summary": weather_summary,
-            "intent": intent or "general exploration",
-        },
-    )
-
-    runner = Runner(
-        agent=agent,
-        app_name="poview",
-        session_service=session_service,
-    )
-
-    # Run the sequential agent pipeline
-    final_event = None
-    async for event in runner.run_async(
-        user_id="poview_user",
-        session_id=session.id,
-        new_message=types.Content(
-            parts=[types.Part(text=context_payload)],
-            role="user",
-        ),
-    ):
-        final_event = event
-
-    # Extract results from session state
-    updated_session = await session_service.get_session(
-        app_name="poview",
-        user_id="poview_user",
-        session_id=session.id,
-    )
-
-    state = updated_session.state if updated_session else {}
+    # Run on the shared pipeline with a per-request session, bounded and always cleaned up
+    global _active_sessions
+    runner, session_service = get_workflow_runner()
+    async with _session_slots:
+        session = await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            state={
+                "origin_lat": lat,
+                "origin_lng": lng,
+                "context_payload": context_payload,
+                "weather_summary": weather_summary,
+                "intent": intent or "general exploration",
+            },
+        )
+        _active_sessions += 1
+        try:
+            # SSE mode makes ScriptWriter emit partial text events
+            run_config = RunConfig(streaming_mode=StreamingMode.SSE if stream_narrative else StreamingMode.NONE)
+            narrative_streamed = False
+            async for event in runner.run_async(
+                user_id=USER_ID,
+                session_id=session.id,
+                new_message=types.Content(
+                    parts=[types.Part(text=context_payload)],
+                    role="user",
+                ),
+                run_config=run_config,
+            ):
+                if event.author == "ScriptWriterAgent" and event.content and event.content.parts:
+                    text = "".join(part.text or "" for part in event.content.parts if not part.thought)
+                    # The final ScriptWriter event repeats the aggregated text of the partial chunks
+                    if text and (event.partial or not narrative_streamed):
+                        narrative_streamed = narrative_streamed or bool(event.partial)
+                        yield {"type": "narrative", "text": text}
+                state_delta = event.actions.state_delta if event.actions else None
+                if state_delta and "visualization_plan" in state_delta:
+                    yield {"type": "visualization_plan", "plan": state_delta["visualization_plan"]}
+
+            # Extract results from session state
+            updated_session = await session_service.get_session(
+                app_name=APP_NAME,
+                user_id=USER_ID,
+                session_id=session.id,
+            )
+            state = dict(updated_session.state) if updated_session else {}
+        finally:
+            _active_sessions -= 1
+            await session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
 
     # Parse the final UI payload
     raw_payload = state.get("final_ui_payload", "{}")
@@ -118,7 +192,13 @@ Nearby Places:
 
     visualization_plan = state.get("visualization_plan", {"waypoints": [], "total_duration": 0})
 
-    return {
+    yield {
+        "type": "result",
         "profile_data": profile_data,
         "visualization_plan": visualization_plan,
     }
+
+
+def get_workflow_session_count() -> int:
+    """Number of workflow sessions this process currently holds open."""
+    return _active_sessions
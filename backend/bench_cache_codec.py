@@ -0,0 +1,80 @@
+import json
+import time
+
+from services.cache_codec import (
+    encode_payload,
+    decode_payload,
+    CODEC_NAMES,
+    COMPRESSION_NAMES,
+    COMPRESSION_ZSTD,
+    _available,
+    zstandard,
+)
+
+ITERATIONS = 2000
+
+
+def sample_profile_wrapper() -> dict:
+    """A v2 cache entry shaped like production: profile text, viewport, weather and a full flight plan."""
+    score = {"value": 7, "note": "Dense grid of protected bike lanes and wide sidewalks along the main avenues."}
+    return {
+        "profile_data": {
+            "neighborhood_name": "Williamsburg",
+            "tagline": "Converted warehouses, waterfront sunsets, relentless brunch",
+            "vibe_description": "A post-industrial creative hub where converted factories host galleries and rooftop bars. "
+                                "Weekends are crowded along Bedford Avenue while the south side stays calmer.",
+            "best_for": ["Young professionals", "Artists", "Food enthusiasts", "Remote workers"],
+            "not_ideal_for": ["Budget-conscious families", "People seeking quiet nights"],
+            "scores": {k: score for k in ("walkability", "food_scene", "nightlife", "family_friendly", "transit", "safety", "affordability")},
+            "highlights": [
+                {"icon_identifier": "park", "title": f"Highlight {i}", "description": "Waterfront park with skyline views and weekend food markets."}
+                for i in range(6)
+            ],
+            "insider_tip": "Take the ferry from North Williamsburg instead of the L train during weekend maintenance.",
+            "one_liner_summary": "Brooklyn's creative engine with the rents to match.",
+        },
+        "viewport": {"low": {"latitude": 40.6976, "longitude": -73.9697}, "high": {"latitude": 40.7252, "longitude": -73.9364}},
+        "location": {"lat": 40.7081, "lng": -73.9571},
+        "weather": {"temperature": 61.3, "condition": "Partly cloudy to overcast", "ai_summary": "Partly cloudy to overcast at 61.3°F.", "render_state": "clear", "is_day": True},
+        "visualization_plan": {
+            "waypoints": [
+                {"label": f"POI {i}", "latitude": 40.70 + i * 0.001, "longitude": -73.95 - i * 0.001, "altitude": 60.0,
+                 "heading": 123.456789, "pitch": -20.0, "roll": 0.0, "duration": 3.0, "pause_after": 1.5}
+                for i in range(10)
+            ],
+            "total_duration": 45.0,
+        },
+    }
+
+
+def bench(label: str, encode, decode, payload: dict):
+    data = encode(payload)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        encode(payload)
+    encode_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        decode(data)
+    decode_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+    print(f"{label:<22} {len(data):>8} {encode_us:>12.1f} {decode_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    payload = sample_profile_wrapper()
+    print(f"{'format':<22} {'bytes':>8} {'encode (us)':>12} {'decode (us)':>12}")
+    # Baseline: what set_cached_profile stored before the codec existed
+    bench("json text (legacy)", lambda v: json.dumps(v), lambda d: json.loads(d), payload)
+    for codec_name, codec in CODEC_NAMES.items():
+        if not _available(codec):
+            print(f"{codec_name:<22} (not installed)")
+            continue
+        for compression_name, compression in COMPRESSION_NAMES.items():
+            if compression == COMPRESSION_ZSTD and zstandard is None:
+                continue
+            bench(
+                f"{codec_name}+{compression_name}",
+                lambda v, c=codec, z=compression: encode_payload(v, 1, codec=c, compression=z),
+                decode_payload,
+                payload,
+            )
@@ -0,0 +1,38 @@
+import time
+
+import numpy as np
+
+from agents.flight_path import nearest_neighbor_tour, two_opt, tour_length
+from services.geo import haversine_matrix
+
+ORIGIN = (40.7081, -73.9571)
+SIZES = (8, 25, 50, 100, 200, 300)
+# POIs scattered across a ~3 km neighborhood around the origin
+SPREAD_DEG = 0.015
+
+
+def synthetic_pois(n: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    lats = ORIGIN[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    lngs = ORIGIN[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG, n)
+    return lats, lngs
+
+
+if __name__ == "__main__":
+    print(f"{'pois':>5} {'matrix (ms)':>12} {'nn (ms)':>9} {'2-opt (ms)':>11} {'listed (km)':>12} {'nn (km)':>9} {'nn+2opt (km)':>13} {'saved':>7}")
+    for n in SIZES:
+        lats, lngs = synthetic_pois(n)
+        start = time.perf_counter()
+        distances = haversine_matrix([ORIGIN[0], *lats], [ORIGIN[1], *lngs])
+        matrix_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        greedy = nearest_neighbor_tour(distances)
+        nn_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        optimized = two_opt(greedy, distances)
+        opt_ms = (time.perf_counter() - start) * 1000
+
+        listed_km = tour_length(range(n + 1), distances) / 1000
+        nn_km = tour_length(greedy, distances) / 1000
+        opt_km = tour_length(optimized, distances) / 1000
+        print(f"{n:>5} {matrix_ms:>12.2f} {nn_ms:>9.2f} {opt_ms:>11.2f} {listed_km:>12.2f} {nn_km:>9.2f} {opt_km:>13.2f} {1 - opt_km / listed_km:>7.0%}")
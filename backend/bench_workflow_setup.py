@@ -0,0 +1,62 @@
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.workflow import APP_NAME, USER_ID, _build_sequential_agent, get_workflow_runner, get_workflow_session_count
+
+ITERATIONS = 200
+
+STATE = {
+    "origin_lat": 40.7081,
+    "origin_lng": -73.9571,
+    "context_payload": "Location: Williamsburg\nAddress: Brooklyn, NY\n" + "- Nearby place (types: cafe, bar, park)\n" * 15,
+    "weather_summary": "Partly cloudy to overcast at 61.3°F.",
+    "intent": "general exploration",
+}
+
+
+async def per_request_setup():
+    """What run_neighborhood_workflow used to do before running: build everything for this request alone."""
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=dict(STATE))
+    Runner(agent=_build_sequential_agent(), app_name=APP_NAME, session_service=session_service)
+
+
+async def shared_setup():
+    """The shared pipeline: only a session is created, and it is deleted after state extraction."""
+    runner, session_service = get_workflow_runner()
+    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=dict(STATE))
+    await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    await session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+
+
+async def bench(label: str, setup):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await setup()
+    elapsed_us = (time.perf_counter() - start) / ITERATIONS * 1e6
+    # Whatever survives a full collection is what the setup really leaves behind
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed_us:>14.1f} {current / 1024:>14.1f} {peak / 1024:>12.1f}")
+
+
+async def main():
+    # Build the shared pipeline once up front, as the first request in a process would
+    get_workflow_runner()
+    print(f"{ITERATIONS} requests")
+    print(f"{'setup':<28} {'per request (us)':>14} {'retained (KiB)':>14} {'peak (KiB)':>12}")
+    await bench("per-request build (before)", per_request_setup)
+    await bench("shared runner (after)", shared_setup)
+    print(f"live workflow sessions after shared runs: {get_workflow_session_count()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
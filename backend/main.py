@@ -1,31 +1,64 @@
 import os
+import math
 import json
 import asyncio
+import time
 import base64
 import traceback
+from contextlib import asynccontextmanager
+from typing import Literal
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Header, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import polyline
 from google.adk.runners import Runner
 from google.adk.agents.run_config import RunConfig, StreamingMode
-from google.adk.agents.live_request_queue import LiveRequestQueue
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
-from services.places_service import get_places_details, get_nearby_places, format_context_payload, get_autocomplete_predictions, contextual_places_search, get_directions, reverse_geocode
-from services.gemini_client import generate_neighborhood_profile, parse_contextual_intent
-from services.redis_cache import get_cached_profile, set_cached_profile
-from services.weather_service import fetch_weather_forecast
-from agents import run_neighborhood_workflow
+from services.places_service import get_places_details, get_places_metrics, format_context_payload, contextual_places_search, route_candidates, reverse_geocode
+from services.gemini_client import generate_neighborhood_profile, stream_neighborhood_profile, get_gemini_metrics
+from services.intent_service import canonicalize_intent, get_intent_keywords, get_intent_metrics
+from services.redis_cache import get_cached_profile, set_cached_profile, listen_for_invalidations, get_cache_metrics
+from services.weather_service import get_weather_metrics
+from services.autocomplete_engine import autocomplete, get_autocomplete_metrics
+from services.http_client import init_http_clients, close_http_clients
+from services.geo import simplify_path
+from services.live_sessions import (
+    reserve_live_slot, register_live_session, touch_live_session, release_live_session,
+    live_id_in_use, live_session_in_use, evict_idle_live_sessions, get_live_session_report,
+    CLOSE_CODE_OVERLOADED, CLOSE_CODE_DUPLICATE,
+)
+from services.session_store import create_session_service, sessions_persist_across_workers
+from services.live_audio import (
+    open_pipeline, close_pipeline, get_live_audio_metrics, PacedLiveRequestQueue,
+    AUDIO, TEXT, MIC_FLUSH_SECONDS, SPEAKER_CHUNK_BYTES,
+)
+from services.aggregation import aggregate_location_context, format_server_timing, get_aggregation_metrics
+from services.single_flight import single_flight, stream_once, generate_once, refresh_in_background, get_single_flight_metrics
+from agents import run_neighborhood_workflow, stream_neighborhood_workflow, get_workflow_session_count
 from agents.live_agent import create_live_agent
+from agents.poi_extractor import get_poi_extraction_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Owns process-wide resources: pooled upstream HTTP clients, the L1 cache invalidation listener
+    and the idle live session sweeper."""
+    await init_http_clients(warm=os.getenv("UPSTREAM_PREWARM", "1") == "1")
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
+    live_session_sweeper = asyncio.create_task(evict_idle_live_sessions())
+    yield
+    invalidation_listener.cancel()
+    live_session_sweeper.cancel()
+    await close_http_clients()
+
 
-app = FastAPI(title="GroundLevel AI Platform")
+app = FastAPI(title="GroundLevel AI Platform", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,20 +70,42 @@ app.add_middleware(
 
 # --- Live Agent Setup ---
 live_agent = create_live_agent()
-live_session_service = InMemorySessionService()
+live_session_service = create_session_service()
 live_runner = Runner(
     agent=live_agent,
     app_name="poview-live",
     session_service=live_session_service,
 )
 
+# Once either side of a live connection ends, the rest gets this long to flush before being cancelled
+LIVE_DRAIN_SECONDS = float(os.getenv("LIVE_DRAIN_SECONDS", "2"))
+
+@app.get("/api/metrics")
+async def metrics():
+    """Operational counters for the shared upstream layers."""
+    return {
+        "gemini": get_gemini_metrics(),
+        "aggregation": get_aggregation_metrics(),
+        "single_flight": get_single_flight_metrics(),
+        "cache": get_cache_metrics(),
+        "weather": get_weather_metrics(),
+        "places": get_places_metrics(),
+        "autocomplete": get_autocomplete_metrics(),
+        "intent": get_intent_metrics(),
+        "live_audio": get_live_audio_metrics(),
+        "workflow": {"sessions": get_workflow_session_count(), "poi_extraction": get_poi_extraction_metrics()},
+    }
+
 @app.get("/api/autocomplete")
-async def autocomplete_proxy(input: str):
-    """Secure proxy for Places Autocomplete."""
+async def autocomplete_proxy(input: str, session_token: str = None, client_id: str = None):
+    """Secure proxy for Places Autocomplete, served from the prefix cache where possible.
+
+    Passing a stable `client_id` (or `session_token`) lets a newer keystroke cancel the
+    previous in-flight upstream call for the same client.
+    """
     if not input:
         return {"suggestions": []}
-    suggestions = await get_autocomplete_predictions(input)
-    return {"suggestions": suggestions}
+    return await autocomplete(input, client_key=session_token or client_id, session_token=session_token)
 
 @app.get("/api/resolve_location/{place_id}")
 async def resolve_location(place_id: str):
@@ -81,10 +136,18 @@ async def reverse_geocode_endpoint(lat: float, lng: float):
     }
 
 
+# Candidates pulled from text search vs. results shown after ranking by walking time
+PROXIMITY_CANDIDATES = int(os.getenv("PROXIMITY_CANDIDATES", "10"))
+PROXIMITY_MAX_RESULTS = int(os.getenv("PROXIMITY_MAX_RESULTS", "5"))
+
 class ProximityRequest(BaseModel):
     place_id: str
     intent: str
     radius: float = 0.4
+    # "coordinates" returns [[lat, lng], ...]; "encoded" returns the Google encoded polyline string
+    path_format: Literal["coordinates", "encoded"] = "coordinates"
+    # Douglas-Peucker tolerance in meters; 0 keeps every point of the route
+    simplify_tolerance_m: float = Field(0.0, ge=0.0)
 
 @app.post("/api/proximity_search")
 async def proximity_search(req: ProximityRequest):
@@ -103,7 +166,7 @@ async def proximity_search(req: ProximityRequest):
         
     # 2. Parse intent with Gemini to get Places keywords
     try:
-        intent_parsed = await parse_contextual_intent(req.intent)
+        intent_parsed = await get_intent_keywords(req.intent)
         keywords = intent_parsed.get("keywords", [])
         if not keywords:
             keywords = [req.intent] # Fallback
@@ -111,32 +174,38 @@ async def proximity_search(req: ProximityRequest):
         print(f"Gemini Intent Parsing Error: {e}")
         keywords = [req.intent] # Fallback
         
-    # 3. Search Google Places within bounds (returns a list of dicts)
-    recommendations = await contextual_places_search(lat, lng, req.radius, keywords)
+    # 3. Search Google Places within bounds (returns a list of dicts); over-fetch so routing can rank
+    recommendations = await contextual_places_search(lat, lng, req.radius, keywords, max_results=PROXIMITY_CANDIDATES)
     if not recommendations:
         raise HTTPException(status_code=404, detail="No contextual matches found nearby.")
-        
-    # 4. Concurrently Get Actual Route directions for all recommendations
-    async def fetch_route(rec):
+
+    # 4. Rank candidates by walking time in one matrix call, then fetch routes only for the displayed ones
+    routed = await route_candidates(lat, lng, recommendations, PROXIMITY_MAX_RESULTS)
+    if not routed:
+        raise HTTPException(status_code=404, detail="No reachable contextual matches found nearby.")
+
+    def routing_path(rec):
+        encoded = rec["encoded_polyline"]
         try:
-            directions = await get_directions(lat, lng, rec["lat"], rec["lng"])
-            path = polyline.decode(directions) if directions else [
-                [lat, lng],
-                [rec["lat"], rec["lng"]]
-            ]
-            return path
+            if encoded:
+                # Encoded paths pass through untouched unless they need simplifying
+                if req.path_format == "encoded" and req.simplify_tolerance_m <= 0:
+                    return encoded
+                path = simplify_path(polyline.decode(encoded), req.simplify_tolerance_m)
+                if req.path_format == "encoded":
+                    return polyline.encode(path.tolist())
+                return path.tolist()
         except Exception as e:
             print(f"Directions API fallback to straight line for {rec['name']}: {e}")
-            return [
-                [lat, lng],
-                [rec["lat"], rec["lng"]]
-            ]
-
-    routes = await asyncio.gather(*[fetch_route(r) for r in recommendations])
+        straight = [
+            [lat, lng],
+            [rec["lat"], rec["lng"]]
+        ]
+        return polyline.encode(straight) if req.path_format == "encoded" else straight
 
     # Combine recommendations with their respective routing paths
     results = []
-    for i, rec in enumerate(recommendations):
+    for rec in routed:
         results.append({
             "coordinates": [rec["lat"], rec["lng"]],
             "metadata": {
@@ -144,52 +213,60 @@ async def proximity_search(req: ProximityRequest):
                 "rating": rec["rating"],
                 "description": rec["description"]
             },
-            "routing_path": routes[i]
+            "route": rec["route"],
+            "routing_path": routing_path(rec)
         })
 
     # 5. Return structured array of recommendations
     return {
-        "results": results
+        "results": results,
+        "path_format": req.path_format
     }
 
-@app.get("/api/profile/{place_id}")
-async def fetch_neighborhood_profile(place_id: str, intent: str = None):
-    """Main Orchestration endpoint for the Foundation Neighborhood Profile"""
-            
-    # 1. Check strict Redis Cache (Zero Token Expenditure)
-    cache_key = f"{place_id}_{intent}" if intent else place_id
-    cached_payload = await get_cached_profile(cache_key)
-    if cached_payload:
-        if "viewport" in cached_payload and "profile_data" in cached_payload and "weather" in cached_payload:
-            return {
-                "source": "cache", 
-                "data": cached_payload["profile_data"],
-                "viewport": cached_payload["viewport"],
-                "location": cached_payload["location"],
-                "weather": cached_payload["weather"]
-            }
-        # If it's old cache without viewport, we fall through and regenerate to get the bounds
-        
-    # 2. Asynchronously aggregate Google Places Data
-    location_details = await get_places_details(place_id)
-    if not location_details:
-        raise HTTPException(status_code=404, detail="Location not found")
-        
-    lat = location_details.get("geometry", {}).get("location", {}).get("lat")
-    lng = location_details.get("geometry", {}).get("location", {}).get("lng")
-    
-    if not lat or not lng:
-        raise HTTPException(status_code=400, detail="Location geometry invalid")
-        
-    nearby_places = await get_nearby_places(lat, lng)
-    weather = await fetch_weather_forecast(lat, lng)
-    
-    # 3. Format context explicitly matching the architectural constraints
+V1_CACHE_FIELDS = ("profile_data", "viewport", "weather")
+V2_CACHE_FIELDS = ("profile_data", "viewport", "weather", "visualization_plan")
+
+# Past the soft TTL a cached profile is still served, but refreshed in the background.
+# The hard TTL is the Redis expiry set by set_cached_profile (72 hours).
+PROFILE_SOFT_TTL_SECONDS = float(os.getenv("PROFILE_SOFT_TTL_HOURS", "12")) * 3600
+
+
+def _profile_cache_key(place_id: str, intent: str = None, version: str = None) -> str:
+    """Equivalent phrasings of an intent ("Quiet parks!", "quiet  parks") share one cached profile."""
+    parts = [version, place_id, canonicalize_intent(intent)]
+    return "_".join(p for p in parts if p)
+
+
+def _is_stale(cached_payload: dict) -> bool:
+    generated_at = cached_payload.get("generated_at")
+    # Entries migrated from before generation timestamps existed have an unknown age
+    return generated_at is None or time.time() - generated_at > PROFILE_SOFT_TTL_SECONDS
+
+
+def _cached_profile_response(cached_payload: dict, fields) -> dict:
+    """Builds the client response for a complete cache entry, or None if any field is missing."""
+    if not cached_payload or not all(k in cached_payload for k in fields):
+        return None
+    body = {
+        "source": "cache",
+        "stale": _is_stale(cached_payload),
+        "data": cached_payload["profile_data"],
+        "viewport": cached_payload["viewport"],
+        "location": cached_payload["location"],
+        "weather": cached_payload["weather"],
+    }
+    if "visualization_plan" in fields:
+        body["visualization_plan"] = cached_payload["visualization_plan"]
+    return body
+
+
+def _profile_v1_prompt(location_details: dict, nearby_places: list, weather: dict, intent: str = None) -> str:
+    """Builds the Gemini prompt shared by the blocking and streaming v1 profile endpoints."""
     prompt_payload = format_context_payload(location_details, nearby_places)
-    
+
     # System Instruction injection specific to Module 1 with Google WeatherForecast 2 Integration
     intent_instruction = f"The user's specific search intent is: '{intent}'. Tailor the 'vibe_description' to specifically explain WHY this neighborhood is (or isn't) highly relevant to their intent in exactly 2 punchy, actionable sentences. " if intent else ""
-    
+
     system_instruction = (
         "You are an expert urban analyst. Your tone must be direct, highly specific, and culturally intuitive. "
         "Do NOT use diplomatic platitudes. Provide unvarnished assessments. You must reply strictly in the exact JSON format requested. "
@@ -197,126 +274,424 @@ async def fetch_neighborhood_profile(place_id: str, intent: str = None):
         "You MUST adapt the 'vibe_description', 'best_for', and 'not_ideal_for' arrays to heavily reflect this current weather reality. "
         f"{intent_instruction}"
     )
-    
-    full_prompt = f"SYSTEM INSTRUCTION: {system_instruction}\n\nDATA PAYLOAD:\n{prompt_payload}"
-    
-    # 4. Generate AI Insight via Gemini 3.1 Pro
-    try:
-        profile_data = await generate_neighborhood_profile(full_prompt)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Gemini API Error: {e}")
-        raise HTTPException(status_code=500, detail="AI insights temporarily unavailable")
-        
-    # 5. Set Redis Cache with 72-hour TTL
-    cache_wrapper = {
-        "profile_data": profile_data,
-        "viewport": location_details.get("geometry", {}).get("viewport"),
-        "location": location_details.get("geometry", {}).get("location"),
-        "weather": weather
-    }
-    await set_cached_profile(cache_key, cache_wrapper)
-    
-    return {
-        "source": "gemini", 
-        "data": profile_data,
-        "viewport": cache_wrapper["viewport"],
-        "location": cache_wrapper["location"],
-        "weather": weather
-    }
+
+    return f"SYSTEM INSTRUCTION: {system_instruction}\n\nDATA PAYLOAD:\n{prompt_payload}"
+
+
+async def _build_profile_v1(place_id: str, intent: str, cache_key: str, refresh: bool = False) -> dict:
+    # 1-2. Check strict Redis Cache (Zero Token Expenditure) while aggregating Google Places Data.
+    # Old cache entries without viewport fall through and regenerate to get the bounds.
+    # A background refresh skips the cache lookup and always regenerates.
+    context = await aggregate_location_context(
+        place_id,
+        cache_key=None if refresh else cache_key,
+        cache_fields=V1_CACHE_FIELDS,
+    )
+
+    if context.get("cached"):
+        body = _cached_profile_response(context["cached"], V1_CACHE_FIELDS)
+        if body["stale"]:
+            refresh_in_background(cache_key, lambda: _build_profile_v1(place_id, intent, cache_key, refresh=True))
+        return {"body": body, "timings": context["timings"]}
+    if context.get("error"):
+        raise HTTPException(status_code=context["status_code"], detail=context["error"])
+
+    location_details = context["location_details"]
+    nearby_places = context["nearby_places"]
+    weather = context["weather"]
+
+    async def generate():
+        # 3. Format context explicitly matching the architectural constraints
+        full_prompt = _profile_v1_prompt(location_details, nearby_places, weather, intent)
+
+        # 4. Generate AI Insight via Gemini 3.1 Pro
+        try:
+            profile_data = await generate_neighborhood_profile(full_prompt)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Gemini API Error: {e}")
+            raise HTTPException(status_code=500, detail="AI insights temporarily unavailable")
+
+        # 5. Set Redis Cache with 72-hour TTL
+        cache_wrapper = {
+            "profile_data": profile_data,
+            "viewport": location_details.get("geometry", {}).get("viewport"),
+            "location": location_details.get("geometry", {}).get("location"),
+            "weather": weather,
+            "generated_at": time.time(),
+        }
+        await set_cached_profile(cache_key, cache_wrapper)
+
+        return {
+            "source": "gemini",
+            "data": profile_data,
+            "viewport": cache_wrapper["viewport"],
+            "location": cache_wrapper["location"],
+            "weather": weather
+        }
+
+    async def load_cached():
+        # Only a fresh entry means the lock holder finished; a stale one is what is being replaced
+        body = _cached_profile_response(await get_cached_profile(cache_key), V1_CACHE_FIELDS)
+        return body if body and not body["stale"] else None
+
+    body = await generate_once(cache_key, generate, load_cached)
+    return {"body": body, "timings": context["timings"]}
+
+
+@app.get("/api/profile/{place_id}")
+async def fetch_neighborhood_profile(place_id: str, response: Response, intent: str = None):
+    """Main Orchestration endpoint for the Foundation Neighborhood Profile"""
+    cache_key = _profile_cache_key(place_id, intent)
+    # Concurrent requests for the same key share a single pipeline run
+    result = await single_flight(f"profile:{cache_key}", lambda: _build_profile_v1(place_id, intent, cache_key))
+    response.headers["Server-Timing"] = format_server_timing(result["timings"])
+    return result["body"]
+
+
+def _sse_event(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.get("/api/profile_stream/{place_id}")
+async def stream_neighborhood_profile_sse(place_id: str, intent: str = None):
+    """SSE variant of /api/profile: emits each profile field as soon as Gemini has generated it.
+
+    Events: `context` (viewport, location, weather), one `field` per top-level profile field,
+    then `done` with the assembled profile, or `error` if generation fails midway.
+    """
+    cache_key = _profile_cache_key(place_id, intent)
+    context = await aggregate_location_context(place_id, cache_key=cache_key, cache_fields=V1_CACHE_FIELDS)
+    if context.get("error"):
+        raise HTTPException(status_code=context["status_code"], detail=context["error"])
+    timing_header = {"Server-Timing": format_server_timing(context["timings"])}
+
+    if context.get("cached"):
+        body = _cached_profile_response(context["cached"], V1_CACHE_FIELDS)
+        if body["stale"]:
+            refresh_in_background(cache_key, lambda: _build_profile_v1(place_id, intent, cache_key, refresh=True))
+
+        async def replay_cached():
+            yield _sse_event("context", {k: body[k] for k in ("source", "viewport", "location", "weather")})
+            for field, value in body["data"].items():
+                yield _sse_event("field", {"name": field, "value": value})
+            yield _sse_event("done", body)
+
+        return StreamingResponse(replay_cached(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", **timing_header})
+
+    location_details = context["location_details"]
+    weather = context["weather"]
+    viewport = location_details.get("geometry", {}).get("viewport")
+    location = location_details.get("geometry", {}).get("location")
+    full_prompt = _profile_v1_prompt(location_details, context["nearby_places"], weather, intent)
+
+    async def produce(publish):
+        """Generates once per key behind the same lock as /api/profile; every stream replays its events."""
+        publish(("context", {"source": "gemini", "viewport": viewport, "location": location, "weather": weather}))
+
+        async def generate():
+            profile_data = {}
+            async for field, value in stream_neighborhood_profile(full_prompt):
+                profile_data[field] = value
+                publish(("field", {"name": field, "value": value}))
+
+            # Cache the assembled profile exactly as the blocking endpoint does
+            cache_wrapper = {
+                "profile_data": profile_data,
+                "viewport": viewport,
+                "location": location,
+                "weather": weather,
+                "generated_at": time.time(),
+            }
+            await set_cached_profile(cache_key, cache_wrapper)
+            return {
+                "source": "gemini",
+                "data": profile_data,
+                "viewport": viewport,
+                "location": location,
+                "weather": weather
+            }
+
+        async def load_cached():
+            body = _cached_profile_response(await get_cached_profile(cache_key), V1_CACHE_FIELDS)
+            return body if body and not body["stale"] else None
+
+        body = await generate_once(cache_key, generate, load_cached)
+        if body["source"] == "cache":
+            # Another worker generated it; replay its fields
+            for field, value in body["data"].items():
+                publish(("field", {"name": field, "value": value}))
+        publish(("done", body))
+
+    async def generate_stream():
+        try:
+            async for event, payload in stream_once(f"profile_stream:{cache_key}", produce):
+                yield _sse_event(event, payload)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Gemini API Error: {e}")
+            yield _sse_event("error", {"detail": "AI insights temporarily unavailable"})
+
+    return StreamingResponse(generate_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", **timing_header})
+
+
+async def _build_profile_v2(place_id: str, intent: str, cache_key: str, refresh: bool = False) -> dict:
+    # 1-2. Check Redis Cache and aggregate data (same stage graph as v1)
+    context = await aggregate_location_context(
+        place_id,
+        cache_key=None if refresh else cache_key,
+        cache_fields=V2_CACHE_FIELDS,
+    )
+
+    if context.get("cached"):
+        body = _cached_profile_response(context["cached"], V2_CACHE_FIELDS)
+        if body["stale"]:
+            refresh_in_background(cache_key, lambda: _build_profile_v2(place_id, intent, cache_key, refresh=True))
+        return {"body": body, "timings": context["timings"]}
+    if context.get("error"):
+        raise HTTPException(status_code=context["status_code"], detail=context["error"])
+
+    location_details = context["location_details"]
+    nearby_places = context["nearby_places"]
+    weather = context["weather"]
+
+    async def generate():
+        # 3. Run Agent ADK workflow
+        try:
+            result = await run_neighborhood_workflow(
+                place_id=place_id,
+                location_details=location_details,
+                nearby_places=nearby_places,
+                weather=weather,
+                intent=intent,
+            )
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Agent Workflow Error: {e}")
+            raise HTTPException(status_code=500, detail="AI agent workflow temporarily unavailable")
+
+        profile_data = result["profile_data"]
+        visualization_plan = result["visualization_plan"]
+
+        # 4. Cache the full response
+        cache_wrapper = {
+            "profile_data": profile_data,
+            "viewport": location_details.get("geometry", {}).get("viewport"),
+            "location": location_details.get("geometry", {}).get("location"),
+            "weather": weather,
+            "visualization_plan": visualization_plan,
+            "generated_at": time.time(),
+        }
+        await set_cached_profile(cache_key, cache_wrapper)
+
+        return {
+            "source": "agents",
+            "data": profile_data,
+            "viewport": cache_wrapper["viewport"],
+            "location": cache_wrapper["location"],
+            "weather": weather,
+            "visualization_plan": visualization_plan,
+        }
+
+    async def load_cached():
+        body = _cached_profile_response(await get_cached_profile(cache_key), V2_CACHE_FIELDS)
+        return body if body and not body["stale"] else None
+
+    body = await generate_once(cache_key, generate, load_cached)
+    return {"body": body, "timings": context["timings"]}
+
 
 @app.get("/api/profile_v2/{place_id}")
-async def fetch_neighborhood_profile_v2(place_id: str, intent: str = None):
+async def fetch_neighborhood_profile_v2(place_id: str, response: Response, intent: str = None):
     """V2 Neighborhood Profile using Agent ADK sequential workflow."""
-
-    # 1. Check Redis Cache
-    cache_key = f"v2_{place_id}_{intent}" if intent else f"v2_{place_id}"
-    cached_payload = await get_cached_profile(cache_key)
-    if cached_payload:
-        if all(k in cached_payload for k in ("profile_data", "viewport", "weather", "visualization_plan")):
+    cache_key = _profile_cache_key(place_id, intent, version="v2")
+    result = await single_flight(f"profile:{cache_key}", lambda: _build_profile_v2(place_id, intent, cache_key))
+    response.headers["Server-Timing"] = format_server_timing(result["timings"])
+    return result["body"]
+
+
+@app.get("/api/profile_v2_stream/{place_id}")
+async def stream_neighborhood_profile_v2(place_id: str, intent: str = None):
+    """SSE variant of /api/profile_v2 that streams the agent workflow as it progresses.
+
+    Events: `context`, `narrative` chunks from the ScriptWriter, `visualization_plan` as soon as
+    the GlobeController has computed it (so the flyover can start), then `done` with the full
+    v2 response, or `error` if the workflow fails.
+    """
+    cache_key = _profile_cache_key(place_id, intent, version="v2")
+    context = await aggregate_location_context(place_id, cache_key=cache_key, cache_fields=V2_CACHE_FIELDS)
+    if context.get("error"):
+        raise HTTPException(status_code=context["status_code"], detail=context["error"])
+    headers = {"Cache-Control": "no-cache", "Server-Timing": format_server_timing(context["timings"])}
+
+    if context.get("cached"):
+        body = _cached_profile_response(context["cached"], V2_CACHE_FIELDS)
+        if body["stale"]:
+            refresh_in_background(cache_key, lambda: _build_profile_v2(place_id, intent, cache_key, refresh=True))
+
+        async def replay_cached():
+            yield _sse_event("context", {k: body[k] for k in ("source", "viewport", "location", "weather")})
+            yield _sse_event("visualization_plan", body["visualization_plan"])
+            yield _sse_event("done", body)
+
+        return StreamingResponse(replay_cached(), media_type="text/event-stream", headers=headers)
+
+    location_details = context["location_details"]
+    weather = context["weather"]
+    viewport = location_details.get("geometry", {}).get("viewport")
+    location = location_details.get("geometry", {}).get("location")
+
+    async def produce(publish):
+        """Runs the workflow once per key behind the same lock as /api/profile_v2; every stream replays its events."""
+        publish(("context", {"source": "agents", "viewport": viewport, "location": location, "weather": weather}))
+
+        async def generate():
+            result = None
+            async for update in stream_neighborhood_workflow(
+                place_id=place_id,
+                location_details=location_details,
+                nearby_places=context["nearby_places"],
+                weather=weather,
+                intent=intent,
+            ):
+                if update["type"] == "narrative":
+                    publish(("narrative", {"text": update["text"]}))
+                elif update["type"] == "visualization_plan":
+                    publish(("visualization_plan", update["plan"]))
+                else:
+                    result = update
+
+            # Cache the full response exactly as the blocking endpoint does
+            cache_wrapper = {
+                "profile_data": result["profile_data"],
+                "viewport": viewport,
+                "location": location,
+                "weather": weather,
+                "visualization_plan": result["visualization_plan"],
+                "generated_at": time.time(),
+            }
+            await set_cached_profile(cache_key, cache_wrapper)
             return {
-                "source": "cache",
-                "data": cached_payload["profile_data"],
-                "viewport": cached_payload["viewport"],
-                "location": cached_payload["location"],
-                "weather": cached_payload["weather"],
-                "visualization_plan": cached_payload["visualization_plan"],
+                "source": "agents",
+                "data": result["profile_data"],
+                "viewport": viewport,
+                "location": location,
+                "weather": weather,
+                "visualization_plan": result["visualization_plan"],
             }
 
-    # 2. Aggregate data (same as v1)
-    location_details = await get_places_details(place_id)
-    if not location_details:
-        raise HTTPException(status_code=404, detail="Location not found")
+        async def load_cached():
+            body = _cached_profile_response(await get_cached_profile(cache_key), V2_CACHE_FIELDS)
+            return body if body and not body["stale"] else None
 
-    lat = location_details.get("geometry", {}).get("location", {}).get("lat")
-    lng = location_details.get("geometry", {}).get("location", {}).get("lng")
+        body = await generate_once(cache_key, generate, load_cached)
+        if body["source"] == "cache":
+            # Another worker ran the workflow; its plan is all there is to replay
+            publish(("visualization_plan", body["visualization_plan"]))
+        publish(("done", body))
+
+    async def workflow_stream():
+        try:
+            async for event, payload in stream_once(f"profile_stream:{cache_key}", produce):
+                yield _sse_event(event, payload)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Agent Workflow Error: {e}")
+            yield _sse_event("error", {"detail": "AI agent workflow temporarily unavailable"})
+
+    return StreamingResponse(workflow_stream(), media_type="text/event-stream", headers=headers)
+
+
+def _flight_timeline(waypoints: list) -> list:
+    """Annotates each waypoint with its index and absolute start offset (seconds from flight start)."""
+    timeline = []
+    offset = 0.0
+    for i, wp in enumerate(waypoints):
+        timeline.append({**wp, "index": i, "offset": round(offset, 3)})
+        offset += wp.get("duration", 3.0) + wp.get("pause_after", 1.0)
+    return timeline
 
-    if not lat or not lng:
-        raise HTTPException(status_code=400, detail="Location geometry invalid")
 
-    nearby_places = await get_nearby_places(lat, lng)
-    weather = await fetch_weather_forecast(lat, lng)
+def _parse_last_event_id(last_event_id: str, waypoint_count: int):
+    """Returns (last waypoint index sent, flight seconds elapsed) from an SSE Last-Event-ID.
 
-    # 3. Run Agent ADK workflow
+    An index outside the timeline or a negative or non-finite time is not a position this flight
+    could have sent, so it yields (None, None) and the stream restarts from the beginning.
+    """
     try:
-        result = await run_neighborhood_workflow(
-            place_id=place_id,
-            location_details=location_details,
-            nearby_places=nearby_places,
-            weather=weather,
-            intent=intent,
-        )
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Agent Workflow Error: {e}")
-        raise HTTPException(status_code=500, detail="AI agent workflow temporarily unavailable")
-
-    profile_data = result["profile_data"]
-    visualization_plan = result["visualization_plan"]
-
-    # 4. Cache the full response
-    cache_wrapper = {
-        "profile_data": profile_data,
-        "viewport": location_details.get("geometry", {}).get("viewport"),
-        "location": location_details.get("geometry", {}).get("location"),
-        "weather": weather,
-        "visualization_plan": visualization_plan,
-    }
-    await set_cached_profile(cache_key, cache_wrapper)
+        if last_event_id and last_event_id.startswith("wp-"):
+            index = int(last_event_id[3:])
+            if 0 <= index < waypoint_count:
+                return index, None
+        elif last_event_id and last_event_id.startswith("t-"):
+            elapsed = float(last_event_id[2:])
+            if math.isfinite(elapsed) and elapsed >= 0:
+                return None, elapsed
+    except ValueError:
+        pass
+    return None, None
 
-    return {
-        "source": "agents",
-        "data": profile_data,
-        "viewport": cache_wrapper["viewport"],
-        "location": cache_wrapper["location"],
-        "weather": weather,
-        "visualization_plan": visualization_plan,
-    }
 
+# Ticks closer together than this only burn CPU and bandwidth; smaller positive heartbeats are raised to it
+DRONE_MIN_HEARTBEAT_SECONDS = 1.0
 
-@app.get("/api/drone_stream/{place_id}")
-async def drone_stream(place_id: str, intent: str = None):
-    """SSE endpoint that streams CameraWaypoints one at a time."""
 
-    cache_key = f"v2_{place_id}_{intent}" if intent else f"v2_{place_id}"
+@app.get("/api/drone_stream/{place_id}")
+async def drone_stream(
+    place_id: str,
+    intent: str = None,
+    heartbeat: float = Query(0.0, ge=0.0, description="Seconds between tick events during the flight (at least 1); 0 closes after the timeline."),
+    last_event_id: str = Header(None),
+):
+    """SSE endpoint that sends the whole precomputed flight timeline up front.
+
+    Each `waypoint` event carries its absolute `offset` so the client schedules the flight itself.
+    With `heartbeat`, `tick` events (id `t-<elapsed>`) follow until the flight ends. On reconnect,
+    `Last-Event-ID` resumes either the timeline transfer (`wp-<i>`) or the flight position (`t-<s>`).
+    """
+
+    if heartbeat > 0:
+        heartbeat = max(heartbeat, DRONE_MIN_HEARTBEAT_SECONDS)
+
+    cache_key = _profile_cache_key(place_id, intent, version="v2")
     cached_payload = await get_cached_profile(cache_key)
 
     if not cached_payload or "visualization_plan" not in cached_payload:
         raise HTTPException(status_code=404, detail="No visualization plan found. Generate a v2 profile first.")
 
     plan = cached_payload["visualization_plan"]
-    waypoints = plan.get("waypoints", [])
+    timeline = _flight_timeline(plan.get("waypoints", []))
+    total_duration = timeline[-1]["offset"] + timeline[-1].get("duration", 3.0) + timeline[-1].get("pause_after", 1.0) if timeline else 0.0
+
+    last_index, resume_at = _parse_last_event_id(last_event_id, len(timeline))
+    if last_index is not None:
+        remaining = timeline[last_index + 1:]
+        resume_at = 0.0
+    elif resume_at is not None:
+        # Keep the waypoint in flight at `resume_at` and everything after it
+        remaining = [wp for wp in timeline if wp["offset"] + wp.get("duration", 3.0) + wp.get("pause_after", 1.0) > resume_at]
+    else:
+        remaining = timeline
+        resume_at = 0.0
 
     async def event_generator():
-        for i, wp in enumerate(waypoints):
-            data = json.dumps(wp)
-            yield f"event: waypoint\ndata: {data}\n\n"
-            # Pause for the waypoint's duration + pause_after to sync with camera flight
-            total_wait = wp.get("duration", 3.0) + wp.get("pause_after", 1.0)
-            await asyncio.sleep(total_wait)
-        yield f"event: done\ndata: {json.dumps({'message': 'Flight complete'})}\n\n"
+        yield "retry: 3000\n\n"
+        yield _sse_event("timeline", {
+            "total_duration": total_duration,
+            "waypoint_count": len(timeline),
+            "resume_at": resume_at,
+            "heartbeat": heartbeat,
+        })
+        for wp in remaining:
+            yield f"id: wp-{wp['index']}\n" + _sse_event("waypoint", wp)
+        # Ticks only mark flight progress for resumption; the client flies from the offsets
+        elapsed = resume_at
+        while heartbeat > 0 and elapsed < total_duration:
+            step = min(heartbeat, total_duration - elapsed)
+            await asyncio.sleep(step)
+            elapsed = round(elapsed + step, 3)
+            yield f"id: t-{elapsed}\n" + _sse_event("tick", {"elapsed": elapsed})
+        yield _sse_event("done", {"message": "Flight complete" if heartbeat > 0 else "Timeline sent"})
 
     return StreamingResponse(
         event_generator(),
@@ -328,17 +703,56 @@ async def drone_stream(place_id: str, intent: str = None):
     )
 
 
+@app.get("/api/live/sessions")
+async def live_sessions():
+    """Live voice session count, capacity and approximate memory held by their sessions."""
+    return await get_live_session_report(live_session_service)
+
+
 @app.websocket("/ws/live/{session_id}")
-async def live_websocket(websocket: WebSocket, session_id: str):
-    """Bidirectional audio streaming via Gemini Live API + ADK."""
+async def live_websocket(websocket: WebSocket, session_id: str, resume_token: str = Query(None)):
+    """Bidirectional audio streaming via Gemini Live API + ADK.
+
+    The first message sent is `{"type": "session", "resume_token": ..., "resumed": ...}`. With a
+    shared session backend, reconnecting with `?resume_token=` resumes that conversation on any worker.
+    """
     await websocket.accept()
 
-    # Create a session for this connection
+    # One connection per client id; a second would share its pipeline and session
+    if live_id_in_use(session_id):
+        await websocket.close(code=CLOSE_CODE_DUPLICATE, reason="Live session already connected")
+        return
+
+    # Refuse immediately when at capacity, before any session or Live API connection exists
+    token = reserve_live_slot(session_id)
+    if token is None:
+        await websocket.close(code=CLOSE_CODE_OVERLOADED, reason="Live session capacity reached")
+        return
+
+    # ADK session ids are issued here and handed to the client as its resume token, so a session
+    # can only be resumed by the client it was issued to, and only where it outlives the connection
     user_id = f"live_user_{session_id}"
-    session = await live_session_service.create_session(
-        app_name="poview-live",
-        user_id=user_id,
-    )
+    try:
+        session = None
+        if resume_token and sessions_persist_across_workers():
+            session = await live_session_service.get_session(
+                app_name="poview-live",
+                user_id=user_id,
+                session_id=resume_token,
+            )
+        resumed = session is not None
+        if session is None:
+            session = await live_session_service.create_session(
+                app_name="poview-live",
+                user_id=user_id,
+            )
+    except Exception:
+        await release_live_session(token, live_session_service)
+        raise
+    if live_session_in_use(session.id):
+        await release_live_session(token, live_session_service, delete=False)
+        await websocket.close(code=CLOSE_CODE_DUPLICATE, reason="Live session already connected")
+        return
 
     # Configure BIDI streaming with audio
     run_config = RunConfig(
@@ -348,34 +762,49 @@ async def live_websocket(websocket: WebSocket, session_id: str):
         output_audio_transcription=types.AudioTranscriptionConfig(),
     )
 
-    live_queue = LiveRequestQueue()
+    live_queue = PacedLiveRequestQueue()
+    pipeline = open_pipeline(session_id)
+
+    async def close_connection(code: int):
+        # Used by the idle sweeper; ending the inbound side winds down every loop below
+        pipeline.inbound.close()
+        await websocket.close(code=code)
+
+    register_live_session(token, "poview-live", user_id, session.id, close_connection)
+    try:
+        await websocket.send_text(json.dumps({"type": "session", "resume_token": session.id, "resumed": resumed}))
+    except Exception:
+        close_pipeline(pipeline)
+        await release_live_session(token, live_session_service, delete=not sessions_persist_across_workers())
+        return
 
     async def upstream_task():
-        """Reads audio/text from WebSocket and pushes into the LiveRequestQueue."""
+        """Reads audio/text from WebSocket into the bounded inbound queue, coalescing mic frames."""
         try:
             while True:
-                data = await websocket.receive()
-
+                if pipeline.mic.pending:
+                    # Flush a trailing partial chunk once the mic goes quiet
+                    try:
+                        data = await asyncio.wait_for(websocket.receive(), MIC_FLUSH_SECONDS)
+                    except asyncio.TimeoutError:
+                        pipeline.flush_mic()
+                        continue
+                else:
+                    data = await websocket.receive()
+
+                if data.get("type") == "websocket.disconnect":
+                    break
+                touch_live_session(token)
                 if "bytes" in data and data["bytes"]:
                     # Binary audio data from browser mic (Int16 PCM 16kHz)
-                    audio_bytes = data["bytes"]
-                    live_queue.send_realtime(
-                        types.Blob(
-                            mime_type="audio/pcm;rate=16000",
-                            data=audio_bytes,
-                        )
-                    )
+                    pipeline.add_mic_frame(data["bytes"])
                 elif "text" in data and data["text"]:
                     # Text message (could be a text command)
                     try:
                         msg = json.loads(data["text"])
                         if msg.get("type") == "text_input":
-                            live_queue.send_content(
-                                types.Content(
-                                    parts=[types.Part(text=msg["text"])],
-                                    role="user",
-                                )
-                            )
+                            pipeline.flush_mic()
+                            pipeline.inbound.put(TEXT, msg["text"])
                     except json.JSONDecodeError:
                         pass
 
@@ -383,11 +812,41 @@ async def live_websocket(websocket: WebSocket, session_id: str):
             pass
         except Exception as e:
             print(f"Upstream error: {e}")
+        finally:
+            pipeline.flush_mic()
+            pipeline.inbound.close()
+
+    async def forward_task():
+        """Feeds the LiveRequestQueue from the inbound queue, holding back while the model lags."""
+        try:
+            while True:
+                item = await pipeline.inbound.get()
+                if item is None:
+                    break
+                # Waiting for the model to catch up lets the bounded inbound queue shed stale audio;
+                # once the model side has ended nothing more is forwarded
+                if not await live_queue.wait_for_room():
+                    break
+                kind, payload = item
+                if kind == TEXT:
+                    live_queue.send_content(
+                        types.Content(
+                            parts=[types.Part(text=payload)],
+                            role="user",
+                        )
+                    )
+                else:
+                    live_queue.send_realtime(
+                        types.Blob(
+                            mime_type="audio/pcm;rate=16000",
+                            data=payload,
+                        )
+                    )
         finally:
             live_queue.close()
 
     async def downstream_task():
-        """Reads events from run_live and sends audio/text back over WebSocket."""
+        """Reads events from run_live into the bounded outbound queue."""
         try:
             async for event in live_runner.run_live(
                 user_id=user_id,
@@ -397,65 +856,50 @@ async def live_websocket(websocket: WebSocket, session_id: str):
             ):
                 if not event:
                     continue
+                touch_live_session(token)
+
+                # Barge-in: the user spoke over the agent, so agent audio still queued is stale
+                if event.interrupted:
+                    pipeline.barge_in()
+                    pipeline.outbound.put(TEXT, json.dumps({"type": "interrupted"}))
 
                 # Handle audio output
                 if event.content and event.content.parts:
                     for part in event.content.parts:
                         # Audio response
                         if part.inline_data and part.inline_data.data:
-                            audio_bytes = part.inline_data.data
-                            try:
-                                await websocket.send_bytes(audio_bytes)
-                            except Exception:
-                                return
+                            pipeline.add_speaker_audio(part.inline_data.data)
 
                         # Text transcription from agent
                         if part.text:
-                            try:
-                                await websocket.send_text(
-                                    json.dumps({
-                                        "type": "transcript",
-                                        "role": "agent",
-                                        "text": part.text,
-                                        "finished": True,
-                                    })
-                                )
-                            except Exception:
-                                return
+                            pipeline.outbound.put(TEXT, json.dumps({
+                                "type": "transcript",
+                                "role": "agent",
+                                "text": part.text,
+                                "finished": True,
+                            }))
 
                 # Handle input transcription
                 if hasattr(event, "input_transcription") and event.input_transcription:
-                    try:
-                        await websocket.send_text(
-                            json.dumps({
-                                "type": "transcript",
-                                "role": "user",
-                                "text": event.input_transcription.text,
-                                "finished": bool(getattr(event.input_transcription, "finished", False)),
-                            })
-                        )
-                    except Exception:
-                        return
+                    pipeline.outbound.put(TEXT, json.dumps({
+                        "type": "transcript",
+                        "role": "user",
+                        "text": event.input_transcription.text,
+                        "finished": bool(getattr(event.input_transcription, "finished", False)),
+                    }))
 
                 # Handle output transcription (agent speech-to-text)
                 if hasattr(event, "output_transcription") and event.output_transcription:
-                    try:
-                        await websocket.send_text(
-                            json.dumps({
-                                "type": "transcript",
-                                "role": "agent",
-                                "text": event.output_transcription.text,
-                                "finished": bool(getattr(event.output_transcription, "finished", False)),
-                            })
-                        )
-                    except Exception:
-                        return
+                    pipeline.outbound.put(TEXT, json.dumps({
+                        "type": "transcript",
+                        "role": "agent",
+                        "text": event.output_transcription.text,
+                        "finished": bool(getattr(event.output_transcription, "finished", False)),
+                    }))
 
                 # Handle tool calls and their results
                 if hasattr(event, "tool_calls") and event.tool_calls:
-                    await websocket.send_text(
-                        json.dumps({"type": "state", "state": "processing"})
-                    )
+                    pipeline.outbound.put(TEXT, json.dumps({"type": "state", "state": "processing"}))
 
                 if hasattr(event, "tool_results") and event.tool_results:
                     for result in event.tool_results:
@@ -468,36 +912,64 @@ async def live_websocket(websocket: WebSocket, session_id: str):
                                         tool_data = json.loads(p.text)
                                     except json.JSONDecodeError:
                                         tool_data = {"text": p.text}
-                        try:
-                            await websocket.send_text(
-                                json.dumps({
-                                    "type": "tool_result",
-                                    "tool": tool_name,
-                                    "data": tool_data,
-                                })
-                            )
-                        except Exception:
-                            return
+                        pipeline.outbound.put(TEXT, json.dumps({
+                            "type": "tool_result",
+                            "tool": tool_name,
+                            "data": tool_data,
+                        }))
 
         except Exception as e:
             print(f"Downstream error: {e}")
             traceback.print_exc()
+            pipeline.outbound.put(TEXT, json.dumps({"type": "error", "message": str(e)}))
+        finally:
+            # No model to talk to any more: stop forwarding and let the connection close
+            live_queue.stop()
+            pipeline.inbound.close()
+            pipeline.outbound.close()
+
+    async def sender_task():
+        """Single writer to the WebSocket; merges queued agent audio into larger sends."""
+        while True:
+            item = await pipeline.outbound.get(coalesce_bytes=SPEAKER_CHUNK_BYTES)
+            if item is None:
+                return
+            kind, payload = item
             try:
-                await websocket.send_text(
-                    json.dumps({"type": "error", "message": str(e)})
-                )
+                if kind == AUDIO:
+                    await websocket.send_bytes(payload)
+                else:
+                    await websocket.send_text(payload)
             except Exception:
-                pass
+                return
 
-    # Run upstream and downstream concurrently
-    upstream = asyncio.create_task(upstream_task())
-    downstream = asyncio.create_task(downstream_task())
+    # Run the receive, forward, model and send loops concurrently
+    tasks = [
+        asyncio.create_task(upstream_task()),
+        asyncio.create_task(forward_task()),
+        asyncio.create_task(downstream_task()),
+        asyncio.create_task(sender_task()),
+    ]
 
+    upstream, forward, downstream, sender = tasks
     try:
-        await asyncio.gather(upstream, downstream, return_exceptions=True)
+        # Either the client or the model ending ends the connection: a finished run_live must not
+        # leave the socket (and its slot) held open by a client that keeps streaming mic audio
+        await asyncio.wait([upstream, downstream], return_when=asyncio.FIRST_COMPLETED)
+        # Give queued replies and the Live API close a moment to go out before tearing down
+        await asyncio.wait([forward, downstream, sender], timeout=LIVE_DRAIN_SECONDS)
     finally:
-        upstream.cancel()
-        downstream.cancel()
+        for task in tasks:
+            task.cancel()
+        close_pipeline(pipeline)
+
+        async def teardown():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # In-process sessions die with the connection; shared ones stay resumable until their TTL
+            await release_live_session(token, live_session_service, delete=not sessions_persist_across_workers())
+
+        # Shielded so the slot is released even when the handler itself is cancelled (e.g. on shutdown)
+        await asyncio.shield(teardown())
         try:
             await websocket.close()
         except Exception:
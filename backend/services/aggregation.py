@@ -0,0 +1,171 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from services.places_service import get_places_details, get_nearby_places
+from services.weather_service import fetch_weather_forecast
+from services.redis_cache import get_cached_profile
+
+# A stage is (dependency names, coroutine function receiving the results gathered so far)
+Stage = Tuple[Sequence[str], Callable[[Dict[str, Any]], Awaitable[Any]]]
+
+# Rolling per-stage timing totals across requests, surfaced through /api/metrics
+_stage_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _record_timing(name: str, duration_ms: float):
+    stats = _stage_stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    stats["count"] += 1
+    stats["total_ms"] += duration_ms
+    stats["max_ms"] = max(stats["max_ms"], duration_ms)
+
+
+async def run_stage_graph(
+    stages: Dict[str, Stage],
+    short_circuit: Optional[Callable[[str, Dict[str, Any]], bool]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+    """Runs each stage as soon as its dependencies resolve, with maximal concurrency.
+
+    `short_circuit(name, results)` is checked after each stage finishes; returning True
+    cancels every stage still running or not yet started. Returns (results, timings)
+    where timings holds per-stage start/end offsets in milliseconds relative to the
+    start of the graph.
+    """
+    graph_start = time.perf_counter()
+    results: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    waiting = dict(stages)
+    running: Dict[asyncio.Task, str] = {}
+
+    async def timed(name: str, func):
+        started = time.perf_counter()
+        result = await func(results)
+        ended = time.perf_counter()
+        timings[name] = {
+            "start_ms": round((started - graph_start) * 1000, 2),
+            "end_ms": round((ended - graph_start) * 1000, 2),
+            "duration_ms": round((ended - started) * 1000, 2),
+        }
+        return result
+
+    def launch_ready():
+        for name, (deps, func) in list(waiting.items()):
+            if all(dep in results for dep in deps):
+                del waiting[name]
+                running[asyncio.ensure_future(timed(name, func))] = name
+
+    launch_ready()
+    try:
+        while running:
+            done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            stop = False
+            for task in done:
+                name = running.pop(task)
+                results[name] = task.result()
+                _record_timing(name, timings[name]["duration_ms"])
+                if short_circuit and short_circuit(name, results):
+                    stop = True
+            if stop:
+                break
+            launch_ready()
+    finally:
+        for task in running:
+            task.cancel()
+        # Let cancelled stages unwind before returning so none outlives the request
+        await asyncio.gather(*running, return_exceptions=True)
+
+    timings["total"] = {"duration_ms": round((time.perf_counter() - graph_start) * 1000, 2)}
+    _record_timing("total", timings["total"]["duration_ms"])
+    return results, timings
+
+
+def _coordinates(location_details: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    location = (location_details or {}).get("geometry", {}).get("location", {})
+    return location.get("lat"), location.get("lng")
+
+
+async def aggregate_location_context(
+    place_id: str,
+    cache_key: Optional[str] = None,
+    cache_fields: Sequence[str] = (),
+) -> Dict[str, Any]:
+    """Gathers everything a profile needs for a place as one dependency graph.
+
+    The cache lookup runs first and Place Details (a billed call) only on a miss; nearby
+    places and weather start as soon as the coordinates are known. A complete cache hit
+    (all `cache_fields` present) short-circuits every upstream call.
+    """
+
+    async def cache_stage(results):
+        return await get_cached_profile(cache_key)
+
+    async def details_stage(results):
+        return await get_places_details(place_id)
+
+    async def nearby_stage(results):
+        lat, lng = _coordinates(results["details"])
+        return await get_nearby_places(lat, lng) if lat and lng else []
+
+    async def weather_stage(results):
+        lat, lng = _coordinates(results["details"])
+        return await fetch_weather_forecast(lat, lng) if lat and lng else None
+
+    stages: Dict[str, Stage] = {
+        "details": (("cache",) if cache_key else (), details_stage),
+        "nearby": (("details",), nearby_stage),
+        "weather": (("details",), weather_stage),
+    }
+    if cache_key:
+        stages["cache"] = ((), cache_stage)
+
+    def is_cache_hit(payload) -> bool:
+        return bool(payload) and all(field in payload for field in cache_fields)
+
+    def short_circuit(name, results) -> bool:
+        if name == "cache" and is_cache_hit(results["cache"]):
+            return True
+        # Unusable details end the graph
+        if name == "details":
+            lat, lng = _coordinates(results["details"])
+            return not lat or not lng
+        return False
+
+    results, timings = await run_stage_graph(stages, short_circuit)
+
+    if is_cache_hit(results.get("cache")):
+        return {"cached": results["cache"], "timings": timings}
+
+    location_details = results.get("details")
+    if not location_details:
+        return {"error": "Location not found", "status_code": 404, "timings": timings}
+
+    lat, lng = _coordinates(location_details)
+    if not lat or not lng:
+        return {"error": "Location geometry invalid", "status_code": 400, "timings": timings}
+
+    return {
+        "cached": None,
+        "location_details": location_details,
+        "lat": lat,
+        "lng": lng,
+        "nearby_places": results["nearby"],
+        "weather": results["weather"],
+        "timings": timings,
+    }
+
+
+def format_server_timing(timings: Dict[str, Dict[str, float]]) -> str:
+    """Renders stage timings as a Server-Timing header value for browser devtools."""
+    return ", ".join(f"{name};dur={t['duration_ms']}" for name, t in timings.items())
+
+
+def get_aggregation_metrics() -> Dict[str, Dict[str, float]]:
+    """Average and worst-case duration per aggregation stage since process start."""
+    return {
+        name: {
+            "count": int(stats["count"]),
+            "avg_ms": round(stats["total_ms"] / stats["count"], 2) if stats["count"] else 0.0,
+            "max_ms": round(stats["max_ms"], 2),
+        }
+        for name, stats in _stage_stats.items()
+    }
@@ -0,0 +1,205 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.places_service import get_autocomplete_predictions
+
+AUTOCOMPLETE_TTL_SECONDS = int(os.getenv("AUTOCOMPLETE_TTL_SECONDS", "3600"))
+AUTOCOMPLETE_MAX_PREFIXES = int(os.getenv("AUTOCOMPLETE_MAX_PREFIXES", "20000"))
+# Places Autocomplete returns at most five suggestions; fewer means the result set is exhaustive
+PLACES_MAX_SUGGESTIONS = 5
+# Places bills a session from the first keystroke until a details call, capped at a few minutes
+SESSION_TTL_SECONDS = 180
+
+
+class _TrieNode:
+    __slots__ = ("children", "entry")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # (suggestions, complete, expires_at) once this exact prefix has been answered
+        self.entry: Optional[tuple] = None
+
+
+class PrefixTrie:
+    """Suggestion lists keyed by normalized prefix, with TTL and LRU-bounded size."""
+
+    def __init__(self, max_prefixes: int):
+        self.max_prefixes = max_prefixes
+        self._root = _TrieNode()
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+
+    def get(self, prefix: str) -> Optional[tuple]:
+        node = self._find(prefix)
+        if node is None or node.entry is None:
+            return None
+        if node.entry[2] <= time.monotonic():
+            self.delete(prefix)
+            return None
+        self._lru.move_to_end(prefix)
+        return node.entry
+
+    def longest_complete_prefix(self, text: str) -> Optional[tuple]:
+        """Returns (prefix, suggestions) for the longest shorter prefix whose cached result set is complete."""
+        node = self._root
+        best = None
+        now = time.monotonic()
+        for i, char in enumerate(text[:-1]):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.entry is not None and node.entry[1] and node.entry[2] > now:
+                best = (text[: i + 1], node.entry[0])
+        return best
+
+    def set(self, prefix: str, suggestions: List[Dict[str, Any]], complete: bool, ttl_seconds: float):
+        node = self._root
+        for char in prefix:
+            node = node.children.setdefault(char, _TrieNode())
+        node.entry = (suggestions, complete, time.monotonic() + ttl_seconds)
+        self._lru[prefix] = None
+        self._lru.move_to_end(prefix)
+        while len(self._lru) > self.max_prefixes:
+            oldest, _ = self._lru.popitem(last=False)
+            self._clear_entry(oldest)
+
+    def delete(self, prefix: str):
+        self._lru.pop(prefix, None)
+        self._clear_entry(prefix)
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def _find(self, prefix: str) -> Optional[_TrieNode]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _clear_entry(self, prefix: str):
+        # Drop the entry, then prune now-empty nodes back towards the root
+        path = [self._root]
+        for char in prefix:
+            child = path[-1].children.get(char)
+            if child is None:
+                return
+            path.append(child)
+        path[-1].entry = None
+        for depth in range(len(prefix), 0, -1):
+            node = path[depth]
+            if node.entry is not None or node.children:
+                break
+            del path[depth - 1].children[prefix[depth - 1]]
+
+
+_trie = PrefixTrie(AUTOCOMPLETE_MAX_PREFIXES)
+# Latest upstream call per client, cancelled when a newer keystroke arrives
+_inflight_by_client: Dict[str, asyncio.Task] = {}
+_sessions: Dict[str, tuple] = {}
+
+_autocomplete_stats = {
+    "requests": 0,
+    "exact_hits": 0,
+    "prefix_filter_hits": 0,
+    "upstream_calls": 0,
+    "superseded": 0,
+}
+
+
+def normalize_input(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _suggestion_text(suggestion: Dict[str, Any]) -> str:
+    prediction = suggestion.get("placePrediction") or suggestion.get("queryPrediction") or {}
+    return normalize_input(prediction.get("text", {}).get("text", ""))
+
+
+def _matches(suggestion: Dict[str, Any], query: str) -> bool:
+    """Every query word must start a word of the suggestion text (last word may be partial)."""
+    words = re.findall(r"\w+", _suggestion_text(suggestion))
+    return all(any(word.startswith(token) for word in words) for token in re.findall(r"\w+", query))
+
+
+def session_token_for(client_key: Optional[str], session_token: Optional[str]) -> str:
+    """Reuses the caller's Places session token, or the one tracked for this client, or starts a new one."""
+    if session_token:
+        return session_token
+    now = time.monotonic()
+    if client_key:
+        current = _sessions.get(client_key)
+        if current and current[1] > now:
+            token = current[0]
+        else:
+            token = str(uuid.uuid4())
+        _sessions[client_key] = (token, now + SESSION_TTL_SECONDS)
+        if len(_sessions) > AUTOCOMPLETE_MAX_PREFIXES:
+            for key in [k for k, v in _sessions.items() if v[1] <= now]:
+                del _sessions[key]
+        return token
+    return str(uuid.uuid4())
+
+
+async def autocomplete(input_text: str, client_key: Optional[str] = None, session_token: Optional[str] = None) -> Dict[str, Any]:
+    """Answers a keystroke from the prefix trie when possible, otherwise from Places Autocomplete.
+
+    With a `client_key`, an upstream call still in flight for the same client is cancelled
+    when a newer keystroke arrives; the older request returns `superseded: true`.
+    """
+    _autocomplete_stats["requests"] += 1
+    query = normalize_input(input_text)
+    token = session_token_for(client_key, session_token)
+
+    entry = _trie.get(query)
+    if entry is not None:
+        _autocomplete_stats["exact_hits"] += 1
+        return {"suggestions": entry[0], "sessionToken": token}
+
+    shorter = _trie.longest_complete_prefix(query)
+    if shorter is not None:
+        # A complete result set for a shorter prefix already contains every answer for this one
+        suggestions = [s for s in shorter[1] if _matches(s, query)]
+        _trie.set(query, suggestions, True, AUTOCOMPLETE_TTL_SECONDS)
+        _autocomplete_stats["prefix_filter_hits"] += 1
+        return {"suggestions": suggestions, "sessionToken": token}
+
+    previous = _inflight_by_client.get(client_key) if client_key else None
+    if previous is not None and not previous.done():
+        previous.cancel()
+
+    _autocomplete_stats["upstream_calls"] += 1
+    task = asyncio.ensure_future(get_autocomplete_predictions(input_text, session_token=token))
+    if client_key:
+        _inflight_by_client[client_key] = task
+    try:
+        await asyncio.wait({task})
+    finally:
+        if client_key and _inflight_by_client.get(client_key) is task:
+            del _inflight_by_client[client_key]
+
+    if task.cancelled():
+        _autocomplete_stats["superseded"] += 1
+        return {"suggestions": [], "sessionToken": token, "superseded": True}
+
+    suggestions = task.result()
+    if suggestions:
+        _trie.set(query, suggestions, len(suggestions) < PLACES_MAX_SUGGESTIONS, AUTOCOMPLETE_TTL_SECONDS)
+    return {"suggestions": suggestions, "sessionToken": token}
+
+
+def get_autocomplete_metrics() -> Dict[str, Any]:
+    """Autocomplete cache and cancellation counters for the metrics endpoint."""
+    requests = _autocomplete_stats["requests"]
+    served = _autocomplete_stats["exact_hits"] + _autocomplete_stats["prefix_filter_hits"]
+    return {
+        **_autocomplete_stats,
+        "hit_rate": round(served / requests, 4) if requests else 0.0,
+        "cached_prefixes": len(_trie),
+        "active_sessions": len(_sessions),
+    }
@@ -0,0 +1,141 @@
+import os
+import json
+import struct
+from typing import Any, Tuple
+
+# Optional fast codecs; each falls back to the stdlib JSON path when its package is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Header: magic, header layout version, codec id, compression id, payload schema version
+MAGIC = b"PV"
+HEADER_VERSION = 1
+_HEADER = struct.Struct(">2sBBBH")
+HEADER_SIZE = _HEADER.size
+
+CODEC_JSON = 0
+CODEC_ORJSON = 1
+CODEC_MSGPACK = 2
+CODEC_NAMES = {"json": CODEC_JSON, "orjson": CODEC_ORJSON, "msgpack": CODEC_MSGPACK}
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZSTD = 1
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zstd": COMPRESSION_ZSTD}
+
+# Payloads smaller than this are not worth a compression frame
+COMPRESSION_MIN_BYTES = int(os.getenv("CACHE_COMPRESSION_MIN_BYTES", "256"))
+ZSTD_LEVEL = int(os.getenv("CACHE_ZSTD_LEVEL", "3"))
+
+# Entries written before the header existed are plain JSON text; they report this schema version
+LEGACY_SCHEMA_VERSION = 0
+
+
+def _available(codec: int) -> bool:
+    if codec == CODEC_ORJSON:
+        return orjson is not None
+    if codec == CODEC_MSGPACK:
+        return msgpack is not None
+    return True
+
+
+def _default_codec() -> int:
+    # orjson+zstd measured smallest and fastest to decode on profile payloads (bench_cache_codec.py)
+    requested = CODEC_NAMES.get(os.getenv("CACHE_CODEC", "orjson"), CODEC_ORJSON)
+    for codec in (requested, CODEC_ORJSON, CODEC_MSGPACK, CODEC_JSON):
+        if _available(codec):
+            return codec
+
+
+def _default_compression() -> int:
+    requested = COMPRESSION_NAMES.get(os.getenv("CACHE_COMPRESSION", "zstd"), COMPRESSION_ZSTD)
+    if requested == COMPRESSION_ZSTD and zstandard is None:
+        return COMPRESSION_NONE
+    return requested
+
+
+DEFAULT_CODEC = _default_codec()
+DEFAULT_COMPRESSION = _default_compression()
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def _serialize(value: Any, codec: int) -> bytes:
+    if codec == CODEC_MSGPACK:
+        return msgpack.packb(value, use_bin_type=True)
+    if codec == CODEC_ORJSON:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _deserialize(body: bytes, codec: int) -> Any:
+    if codec == CODEC_MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    if codec == CODEC_ORJSON:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def encode_payload(
+    value: Any,
+    schema_version: int,
+    codec: int = DEFAULT_CODEC,
+    compression: int = DEFAULT_COMPRESSION,
+) -> bytes:
+    """Serializes a cache payload behind a versioned header."""
+    body = _serialize(value, codec)
+    if compression == COMPRESSION_ZSTD and len(body) >= COMPRESSION_MIN_BYTES:
+        body = _zstd_compressor.compress(body)
+    else:
+        compression = COMPRESSION_NONE
+    return _HEADER.pack(MAGIC, HEADER_VERSION, codec, compression, schema_version) + body
+
+
+def decode_payload(raw: bytes) -> Tuple[Any, int]:
+    """Returns (value, schema_version); header-less legacy JSON entries report LEGACY_SCHEMA_VERSION.
+
+    Raises ValueError for entries written with a codec this process cannot read.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if not raw.startswith(MAGIC) or len(raw) < HEADER_SIZE:
+        return json.loads(raw), LEGACY_SCHEMA_VERSION
+    _, header_version, codec, compression, schema_version = _HEADER.unpack_from(raw)
+    if header_version != HEADER_VERSION:
+        raise ValueError(f"Unsupported cache header version {header_version}")
+    if not _available(codec) or (compression == COMPRESSION_ZSTD and zstandard is None):
+        raise ValueError(f"Cache entry uses unavailable codec {codec}/{compression}")
+    body = raw[HEADER_SIZE:]
+    if compression == COMPRESSION_ZSTD:
+        body = _zstd_decompressor.decompress(body)
+    return _deserialize(body, codec), schema_version
+
+
+def payload_size(raw: bytes) -> int:
+    """Serialized size of a payload's value before compression.
+
+    In-process caches hold the decoded value, so they budget memory by this size rather than by
+    the compressed bytes. zstd frames record their content size, so nothing is decompressed here.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if not raw.startswith(MAGIC) or len(raw) < HEADER_SIZE:
+        return len(raw)
+    compression = _HEADER.unpack_from(raw)[3]
+    body = raw[HEADER_SIZE:]
+    if compression != COMPRESSION_ZSTD or zstandard is None:
+        return len(body)
+    size = zstandard.frame_content_size(body)
+    return size if size >= 0 else len(_zstd_decompressor.decompress(body))
@@ -1,12 +1,94 @@
 import os
 import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
 from google import genai
 from google.genai import types
+from services.json_stream import TopLevelFieldParser
 from models import NeighborhoodProfile, ComparativeAnalysis, CinematicNarrative, CommuteAnalysis, IntentKeywords
 
+# Process-wide client shared by the REST endpoints and the ADK agents
 client = genai.Client(api_key=os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY"))
 MODEL_ID = "gemini-3.1-pro-preview"
 
+# Bounds concurrent Gemini calls so a burst of cache misses cannot exhaust quota or memory
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+_gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+_gemini_metrics = {
+    "waiting": 0,
+    "in_flight": 0,
+    "max_waiting": 0,
+    "completed": 0,
+    "failed": 0,
+    "total_wait_seconds": 0.0,
+    "total_call_seconds": 0.0,
+}
+
+
+@asynccontextmanager
+async def gemini_slot():
+    """Acquires one of the bounded Gemini concurrency slots, tracking queue depth and wait time."""
+    _gemini_metrics["waiting"] += 1
+    _gemini_metrics["max_waiting"] = max(_gemini_metrics["max_waiting"], _gemini_metrics["waiting"])
+    queued_at = time.perf_counter()
+    try:
+        await _gemini_semaphore.acquire()
+    finally:
+        _gemini_metrics["waiting"] -= 1
+    started_at = time.perf_counter()
+    _gemini_metrics["total_wait_seconds"] += started_at - queued_at
+    _gemini_metrics["in_flight"] += 1
+    try:
+        yield
+        _gemini_metrics["completed"] += 1
+    except BaseException:
+        _gemini_metrics["failed"] += 1
+        raise
+    finally:
+        _gemini_metrics["in_flight"] -= 1
+        _gemini_metrics["total_call_seconds"] += time.perf_counter() - started_at
+        _gemini_semaphore.release()
+
+
+async def generate_content(contents, config: types.GenerateContentConfig, model: str = MODEL_ID):
+    """Runs a non-blocking Gemini call on the async client surface within the concurrency bound."""
+    async with gemini_slot():
+        return await client.aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=config
+        )
+
+
+async def generate_content_stream(contents, config: types.GenerateContentConfig, model: str = MODEL_ID):
+    """Streams Gemini response text chunks, holding one concurrency slot for the whole stream."""
+    async with gemini_slot():
+        stream = await client.aio.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+
+def get_gemini_metrics() -> dict:
+    """Snapshot of the Gemini call queue for the metrics endpoint."""
+    finished = _gemini_metrics["completed"] + _gemini_metrics["failed"]
+    return {
+        "max_concurrency": GEMINI_MAX_CONCURRENCY,
+        "queue_depth": _gemini_metrics["waiting"],
+        "in_flight": _gemini_metrics["in_flight"],
+        "max_queue_depth": _gemini_metrics["max_waiting"],
+        "completed": _gemini_metrics["completed"],
+        "failed": _gemini_metrics["failed"],
+        "avg_wait_seconds": round(_gemini_metrics["total_wait_seconds"] / finished, 4) if finished else 0.0,
+        "avg_call_seconds": round(_gemini_metrics["total_call_seconds"] / finished, 4) if finished else 0.0,
+    }
+
 def expand_refs(obj, defs):
     """Recursively replaces $ref with the actual object from $defs to satisfy Gemini API requirements."""
     if isinstance(obj, dict):
@@ -43,13 +125,25 @@ async def generate_neighborhood_profile(prompt_payload: str) -> dict:
     )
     
     # We dynamically attach thinking_level if supported in the kwargs or assume the SDK maps it.
-    response = client.models.generate_content(
-        model=MODEL_ID,
-        contents=prompt_payload,
-        config=config
-    )
+    response = await generate_content(prompt_payload, config)
     return json.loads(response.text)
 
+async def stream_neighborhood_profile(prompt_payload: str):
+    """Streams a neighborhood profile as (field, value) pairs, each yielded as soon as it has fully parsed."""
+
+    config = types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=get_gemini_schema(NeighborhoodProfile),
+        temperature=0.4
+    )
+
+    parser = TopLevelFieldParser()
+    async for text in generate_content_stream(prompt_payload, config):
+        for field, value in parser.feed(text):
+            yield field, value
+    if not parser.complete:
+        raise ValueError("Gemini stream ended before the profile JSON was complete")
+
 async def generate_comparative_analysis(prompt_payload: str) -> dict:
     """Generates complex comparative reasoning requiring high cognitive depth."""
     
@@ -60,11 +154,7 @@ async def generate_comparative_analysis(prompt_payload: str) -> dict:
         temperature=0.2
     )
     
-    response = client.models.generate_content(
-        model=MODEL_ID,
-        contents=prompt_payload,
-        config=config
-    )
+    response = await generate_content(prompt_payload, config)
     return json.loads(response.text)
 
 async def generate_cinematic_narrative(prompt_payload: str) -> dict:
@@ -76,11 +166,7 @@ async def generate_cinematic_narrative(prompt_payload: str) -> dict:
         temperature=0.7
     )
     
-    response = client.models.generate_content(
-        model=MODEL_ID,
-        contents=prompt_payload,
-        config=config
-    )
+    response = await generate_content(prompt_payload, config)
     return json.loads(response.text)
 
 async def parse_contextual_intent(intent: str) -> dict:
@@ -94,9 +180,5 @@ async def parse_contextual_intent(intent: str) -> dict:
     
     prompt = f"Analyze the following user search intent and extract the most relevant keywords to be used in a Google Places API text search.\n\nUser Intent: '{intent}'"
     
-    response = client.models.generate_content(
-        model=MODEL_ID,
-        contents=prompt,
-        config=config
-    )
+    response = await generate_content(prompt, config)
     return json.loads(response.text)
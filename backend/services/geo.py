@@ -0,0 +1,154 @@
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_INDEX = {c: i for i, c in enumerate(_GEOHASH_ALPHABET)}
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    """Encodes a coordinate into a geohash cell of `precision` characters."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_bounds(cell: str) -> Tuple[float, float, float, float]:
+    """Returns (south, west, north, east) of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        bits = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_center(cell: str) -> Tuple[float, float]:
+    """Returns the (lat, lng) center of a geohash cell."""
+    south, west, north, east = geohash_bounds(cell)
+    return (south + north) / 2, (west + east) / 2
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Returns the (height, width) of cells at `precision`, in degrees."""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_cells_covering(lat: float, lng: float, radius_m: float, precision: int) -> List[str]:
+    """Lists every geohash cell at `precision` that intersects the circle around (lat, lng)."""
+    cell_height, cell_width = geohash_cell_size(precision)
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    lng_delta = lat_delta / max(math.cos(math.radians(lat)), 1e-6)
+
+    cells = []
+    seen = set()
+    # Sample one point per cell row/column across the circle's bounding box
+    sample_lat = lat - lat_delta
+    while sample_lat <= lat + lat_delta + cell_height:
+        sample_lng = lng - lng_delta
+        while sample_lng <= lng + lng_delta + cell_width:
+            cell = geohash_encode(min(sample_lat, 89.999999), max(min(sample_lng, 179.999999), -180.0), precision)
+            if cell not in seen:
+                seen.add(cell)
+                south, west, north, east = geohash_bounds(cell)
+                # Closest point of the cell to the circle center decides intersection
+                near_lat = min(max(lat, south), north)
+                near_lng = min(max(lng, west), east)
+                if haversine_m(lat, lng, near_lat, near_lng) <= radius_m:
+                    cells.append(cell)
+            sample_lng += cell_width
+        sample_lat += cell_height
+    return cells
+
+
+def simplify_path(points: Sequence[Sequence[float]], tolerance_m: float) -> np.ndarray:
+    """Douglas-Peucker simplification of a (lat, lng) path, keeping points more than `tolerance_m` off the line.
+
+    Points are projected to local meters once; each split then measures every interior point
+    of the segment in a single vectorized pass. Returns an (n, 2) array of kept points.
+    """
+    path = np.asarray(points, dtype=float).reshape(-1, 2)
+    if tolerance_m <= 0 or len(path) < 3:
+        return path
+
+    # Equirectangular projection around the path's mean latitude is accurate at walking scale
+    lat_rad = np.radians(path[:, 0])
+    xy = np.column_stack((
+        np.radians(path[:, 1]) * np.cos(lat_rad.mean()) * EARTH_RADIUS_M,
+        lat_rad * EARTH_RADIUS_M,
+    ))
+
+    keep = np.zeros(len(path), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(path) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        origin = xy[start]
+        direction = xy[end] - origin
+        offsets = xy[start + 1:end] - origin
+        length = math.hypot(direction[0], direction[1])
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return path[keep]
+
+
+def haversine_matrix(lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+    """Pairwise great-circle distances in meters between all points, as an (n, n) array."""
+    phi = np.radians(np.asarray(lats, dtype=float))
+    lmb = np.radians(np.asarray(lngs, dtype=float))
+    dphi = phi[:, None] - phi[None, :]
+    dlmb = lmb[:, None] - lmb[None, :]
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
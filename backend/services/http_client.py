@@ -0,0 +1,79 @@
+import os
+import asyncio
+import httpx
+from typing import Dict, Any
+
+# HTTP/2 needs the optional `h2` package (httpx[http2]); degrade to HTTP/1.1 keep-alive without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.getenv("UPSTREAM_HTTP2", "1") == "1"
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "50")),
+    max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "60")),
+)
+
+# One pooled client per upstream host so each gets its own timeouts and warm connections
+UPSTREAMS: Dict[str, Dict[str, Any]] = {
+    "places": {
+        "base_url": "https://places.googleapis.com",
+        "timeout": httpx.Timeout(8.0, connect=3.0),
+    },
+    "routes": {
+        "base_url": "https://routes.googleapis.com",
+        "timeout": httpx.Timeout(8.0, connect=3.0),
+    },
+    "maps": {
+        "base_url": "https://maps.googleapis.com",
+        "timeout": httpx.Timeout(6.0, connect=3.0),
+    },
+    "weather": {
+        "base_url": "https://api.open-meteo.com",
+        "timeout": httpx.Timeout(5.0, connect=2.0),
+    },
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_http_client(upstream: str) -> httpx.AsyncClient:
+    """Returns the shared pooled client for an upstream, creating it lazily outside the app lifespan."""
+    client = _clients.get(upstream)
+    if client is None or client.is_closed:
+        config = UPSTREAMS[upstream]
+        client = httpx.AsyncClient(
+            base_url=config["base_url"],
+            timeout=config["timeout"],
+            limits=POOL_LIMITS,
+            http2=HTTP2_ENABLED,
+        )
+        _clients[upstream] = client
+    return client
+
+
+async def _warm(upstream: str):
+    """Opens a connection to the upstream so DNS, TCP and TLS are paid before the first real request."""
+    try:
+        await get_http_client(upstream).head("/")
+    except Exception as e:
+        print(f"Upstream pre-warm failed for {upstream}: {e}")
+
+
+async def init_http_clients(warm: bool = True):
+    """Creates every upstream client and pre-warms their connection pools."""
+    for upstream in UPSTREAMS:
+        get_http_client(upstream)
+    if warm:
+        await asyncio.gather(*[_warm(upstream) for upstream in UPSTREAMS])
+
+
+async def close_http_clients():
+    """Closes all pooled upstream clients on application shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*[c.aclose() for c in clients], return_exceptions=True)
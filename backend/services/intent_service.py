@@ -0,0 +1,85 @@
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from services.gemini_client import parse_contextual_intent
+from services.redis_cache import register_l1_cache, get_cached_value, set_cached_value
+from services.single_flight import single_flight
+
+INTENT_TTL_SECONDS = int(os.getenv("INTENT_CACHE_TTL_DAYS", "30")) * 86400
+
+# Function words and request verbs that never change which places match an intent.
+# Nouns such as "places" or "spots" stay: on their own they still describe what to find.
+STOPWORDS = {
+    "a", "an", "the", "some", "any",
+    "i", "im", "me", "my", "we", "us", "our", "you",
+    "want", "wanna", "looking", "find", "show", "recommend",
+    "for", "to", "of", "in", "on", "at", "by", "near", "around", "nearby",
+    "please", "can", "could", "would", "somewhere",
+}
+
+register_l1_cache("intent", max_entries=4096, max_bytes=2 * 1024 * 1024)
+
+_intent_stats = {"lookups": 0, "hits": 0, "llm_calls": 0}
+
+
+def _fold_accents(text: str) -> str:
+    """Drops accents from Latin letters only; marks on other scripts (e.g. Japanese dakuten) carry meaning."""
+    kept = []
+    for c in unicodedata.normalize("NFKD", text):
+        if unicodedata.combining(c) and kept and kept[-1].isascii():
+            continue
+        kept.append(c)
+    return unicodedata.normalize("NFC", "".join(kept))
+
+
+def _drop_repeats(tokens: List[str]) -> List[str]:
+    """Drops a token that repeats the one before it ("parks parks" -> "parks")."""
+    return [t for i, t in enumerate(tokens) if i == 0 or t != tokens[i - 1]]
+
+
+def canonicalize_intent(intent: Optional[str]) -> str:
+    """Folds case, accents, punctuation, whitespace, filler words and repeated words into one form.
+
+    "Quiet parks!" and "  find me some QUIET parks " both become "quiet parks". Word order is
+    kept: "coffee, not tea" and "tea, not coffee" ask for different places. Words in any
+    script are kept; an intent with no word characters at all (e.g. "☕") canonicalizes to its
+    lowercased, whitespace-collapsed text, so a non-empty intent never canonicalizes to "".
+    """
+    if not intent:
+        return ""
+    text = _fold_accents(intent).casefold()
+    text = text.replace("'", "").replace("’", "")
+    tokens = re.findall(r"\w+", text)
+    meaningful = [t for t in tokens if t not in STOPWORDS]
+    # An intent made only of filler words keeps its tokens rather than collapsing to nothing
+    canonical = " ".join(_drop_repeats(meaningful or tokens))
+    return canonical or " ".join(intent.casefold().split())
+
+
+async def get_intent_keywords(intent: str) -> Dict:
+    """Cached IntentKeywords for an intent; equivalent phrasings share one Gemini call."""
+    _intent_stats["lookups"] += 1
+    canonical = canonicalize_intent(intent)
+    if not canonical:
+        return {"keywords": [], "search_rationale": ""}
+
+    cached = await get_cached_value("intent", canonical)
+    if cached is not None:
+        _intent_stats["hits"] += 1
+        return cached
+
+    async def parse():
+        _intent_stats["llm_calls"] += 1
+        parsed = await parse_contextual_intent(intent)
+        if parsed.get("keywords"):
+            await set_cached_value("intent", canonical, parsed, INTENT_TTL_SECONDS)
+        return parsed
+
+    return await single_flight(f"intent:{canonical}", parse)
+
+
+def get_intent_metrics() -> Dict[str, int]:
+    """Intent cache counters for the metrics endpoint."""
+    return dict(_intent_stats)
@@ -0,0 +1,61 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+
+class TopLevelFieldParser:
+    """Incrementally parses a streamed JSON object, yielding each top-level member once it is complete.
+
+    Only nesting depth and string/escape state are tracked while scanning, so every character
+    is visited once; a member's text is handed to `json.loads` only after its closing delimiter.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = None
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Adds streamed text and returns the (key, value) pairs completed by it, in order."""
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self.complete:
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    if char != "{":
+                        raise ValueError("Streamed JSON is not an object")
+                    self._member_start = self._pos + 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._close_member(self._pos))
+                    self.complete = True
+            elif char == "," and self._depth == 1:
+                completed.extend(self._close_member(self._pos))
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _close_member(self, end: int) -> List[Tuple[str, Any]]:
+        text = self._buffer[self._member_start:end].strip()
+        if not text:
+            return []
+        member = json.loads("{" + text + "}")
+        self.fields.update(member)
+        return list(member.items())
@@ -0,0 +1,247 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from google.adk.agents.live_request_queue import LiveRequest, LiveRequestQueue
+from google.genai import types
+
+# Mic audio arrives as 16 kHz Int16 PCM; forward it in 100 ms chunks
+MIC_CHUNK_BYTES = int(os.getenv("LIVE_MIC_CHUNK_BYTES", str(16000 * 2 // 10)))
+# A partial chunk is flushed once the mic has been quiet this long
+MIC_FLUSH_SECONDS = float(os.getenv("LIVE_MIC_FLUSH_MS", "60")) / 1000
+# Agent audio (24 kHz Int16 PCM) queued for the client is merged into sends of at most this size
+SPEAKER_CHUNK_BYTES = int(os.getenv("LIVE_SPEAKER_CHUNK_BYTES", str(24000 * 2 // 5)))
+# Queue bounds in chunks; on overflow the oldest audio is dropped since it is already stale
+INBOUND_MAX_CHUNKS = int(os.getenv("LIVE_INBOUND_MAX_CHUNKS", "50"))
+OUTBOUND_MAX_CHUNKS = int(os.getenv("LIVE_OUTBOUND_MAX_CHUNKS", "64"))
+# Requests handed to ADK but not yet consumed by the Live API connection
+LIVE_QUEUE_HIGH_WATER = int(os.getenv("LIVE_QUEUE_HIGH_WATER", "10"))
+
+AUDIO = "audio"
+TEXT = "text"
+
+
+class FrameCoalescer:
+    """Accumulates variable-size PCM frames and emits fixed-size chunks."""
+
+    def __init__(self, chunk_bytes: int):
+        self.chunk_bytes = chunk_bytes
+        self._buffer = bytearray()
+
+    def add(self, frame: bytes) -> List[bytes]:
+        self._buffer.extend(frame)
+        chunks = []
+        while len(self._buffer) >= self.chunk_bytes:
+            chunks.append(bytes(self._buffer[:self.chunk_bytes]))
+            del self._buffer[:self.chunk_bytes]
+        return chunks
+
+    def flush(self) -> Optional[bytes]:
+        if not self._buffer:
+            return None
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        return chunk
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._buffer)
+
+
+class BoundedMessageQueue:
+    """FIFO of (kind, payload) messages that drops the oldest audio instead of growing without bound.
+
+    Text messages (transcripts, tool results) are never dropped and do not count against the bound.
+    Each message is timestamped on entry so time spent queued can be measured on the way out.
+    """
+
+    def __init__(self, max_audio: int, stats: Dict[str, Any], prefix: str):
+        self.max_audio = max_audio
+        self._items: Deque[Tuple[str, Any, float]] = deque()
+        self._audio_count = 0
+        self._ready = asyncio.Event()
+        self._stats = stats
+        self._prefix = prefix
+        self._closed = False
+
+    def put(self, kind: str, payload: Any):
+        if kind == AUDIO and self._audio_count >= self.max_audio:
+            self._drop_oldest_audio()
+        self._items.append((kind, payload, time.perf_counter()))
+        if kind == AUDIO:
+            self._audio_count += 1
+        self._stats[f"{self._prefix}_max_depth"] = max(self._stats[f"{self._prefix}_max_depth"], len(self._items))
+        self._ready.set()
+
+    def clear_audio(self) -> int:
+        """Drops all queued audio (barge-in), keeping text messages in order. Returns chunks dropped."""
+        dropped = self._audio_count
+        self._items = deque(item for item in self._items if item[0] != AUDIO)
+        self._audio_count = 0
+        self._stats[f"{self._prefix}_dropped"] += dropped
+        return dropped
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    async def get(self, coalesce_bytes: int = 0) -> Optional[Tuple[str, Any]]:
+        """Waits for the next message; consecutive queued audio is merged up to `coalesce_bytes`.
+
+        Returns None once the queue is closed and drained.
+        """
+        while not self._items:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        kind, payload, queued_at = self._items.popleft()
+        if kind == AUDIO:
+            self._audio_count -= 1
+            while coalesce_bytes and self._items and self._items[0][0] == AUDIO and len(payload) + len(self._items[0][1]) <= coalesce_bytes:
+                payload += self._items.popleft()[1]
+                self._audio_count -= 1
+        self._record_latency(time.perf_counter() - queued_at)
+        return kind, payload
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _drop_oldest_audio(self):
+        for index, item in enumerate(self._items):
+            if item[0] == AUDIO:
+                del self._items[index]
+                self._audio_count -= 1
+                self._stats[f"{self._prefix}_dropped"] += 1
+                return
+
+    def _record_latency(self, seconds: float):
+        self._stats[f"{self._prefix}_sent"] += 1
+        self._stats[f"{self._prefix}_total_latency_ms"] += seconds * 1000
+        self._stats[f"{self._prefix}_max_latency_ms"] = max(self._stats[f"{self._prefix}_max_latency_ms"], seconds * 1000)
+
+
+class PacedLiveRequestQueue(LiveRequestQueue):
+    """LiveRequestQueue whose producer can wait for the model to work through its backlog.
+
+    ADK's queue is unbounded; the backlog is counted here from sends and from the model's
+    reads, and `wait_for_room` wakes when a read brings it under the high-water mark.
+    """
+
+    def __init__(self, high_water: int = LIVE_QUEUE_HIGH_WATER):
+        super().__init__()
+        self.high_water = high_water
+        self._backlog = 0
+        self._room = asyncio.Event()
+        self._room.set()
+        self._stopped = False
+
+    def send_content(self, content: types.Content):
+        self._backlog += 1
+        super().send_content(content)
+
+    def send_realtime(self, blob: types.Blob):
+        self._backlog += 1
+        super().send_realtime(blob)
+
+    async def get(self) -> LiveRequest:
+        request = await super().get()
+        if not request.close:
+            self._backlog -= 1
+            if self._backlog < self.high_water:
+                self._room.set()
+        return request
+
+    def stop(self):
+        """The model side has ended; releases any waiting producer."""
+        self._stopped = True
+        self._room.set()
+
+    async def wait_for_room(self) -> bool:
+        """Waits until the backlog is under the high-water mark. Returns False once stopped."""
+        while self._backlog >= self.high_water and not self._stopped:
+            self._room.clear()
+            await self._room.wait()
+        return not self._stopped
+
+
+class LiveAudioPipeline:
+    """Per-connection inbound (mic to model) and outbound (model to client) queues and their metrics."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.stats: Dict[str, Any] = {"barge_ins": 0, "mic_bytes": 0, "speaker_bytes": 0}
+        for prefix in ("inbound", "outbound"):
+            self.stats.update({
+                f"{prefix}_max_depth": 0,
+                f"{prefix}_dropped": 0,
+                f"{prefix}_sent": 0,
+                f"{prefix}_total_latency_ms": 0.0,
+                f"{prefix}_max_latency_ms": 0.0,
+            })
+        self.mic = FrameCoalescer(MIC_CHUNK_BYTES)
+        self.inbound = BoundedMessageQueue(INBOUND_MAX_CHUNKS, self.stats, "inbound")
+        self.outbound = BoundedMessageQueue(OUTBOUND_MAX_CHUNKS, self.stats, "outbound")
+
+    def add_mic_frame(self, frame: bytes):
+        self.stats["mic_bytes"] += len(frame)
+        for chunk in self.mic.add(frame):
+            self.inbound.put(AUDIO, chunk)
+
+    def flush_mic(self):
+        chunk = self.mic.flush()
+        if chunk:
+            self.inbound.put(AUDIO, chunk)
+
+    def add_speaker_audio(self, audio: bytes):
+        self.stats["speaker_bytes"] += len(audio)
+        self.outbound.put(AUDIO, audio)
+
+    def barge_in(self) -> int:
+        """The user started talking over the agent: queued agent audio is stale, so drop it."""
+        self.stats["barge_ins"] += 1
+        return self.outbound.clear_audio()
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = {
+            "age_seconds": round(time.time() - self.started_at, 1),
+            "inbound_depth": len(self.inbound),
+            "outbound_depth": len(self.outbound),
+        }
+        for key, value in self.stats.items():
+            if key.endswith("_total_latency_ms"):
+                prefix = key[: -len("_total_latency_ms")]
+                sent = self.stats[f"{prefix}_sent"]
+                snapshot[f"{prefix}_avg_latency_ms"] = round(value / sent, 2) if sent else 0.0
+            elif isinstance(value, float):
+                snapshot[key] = round(value, 2)
+            else:
+                snapshot[key] = value
+        return snapshot
+
+
+_pipelines: Dict[str, LiveAudioPipeline] = {}
+
+
+def open_pipeline(session_id: str) -> LiveAudioPipeline:
+    pipeline = LiveAudioPipeline(session_id)
+    _pipelines[session_id] = pipeline
+    return pipeline
+
+
+def close_pipeline(pipeline: LiveAudioPipeline):
+    pipeline.inbound.close()
+    pipeline.outbound.close()
+    if _pipelines.get(pipeline.session_id) is pipeline:
+        del _pipelines[pipeline.session_id]
+
+
+def get_live_audio_metrics() -> Dict[str, Any]:
+    """Per-connection queue depth, drop and latency counters for the metrics endpoint."""
+    return {
+        "connections": len(_pipelines),
+        "per_connection": {session_id: p.snapshot() for session_id, p in _pipelines.items()},
+    }
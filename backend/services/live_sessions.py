@@ -0,0 +1,133 @@
+import os
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Each live session holds a Gemini Live connection plus its transcript in memory
+LIVE_MAX_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", "50"))
+# Connections with no audio, text or agent events for this long are closed
+LIVE_IDLE_TIMEOUT_SECONDS = float(os.getenv("LIVE_IDLE_TIMEOUT_SECONDS", "300"))
+LIVE_SWEEP_INTERVAL_SECONDS = float(os.getenv("LIVE_SWEEP_INTERVAL_SECONDS", "30"))
+# WebSocket close codes: 1013 "try again later" at capacity, 1008 policy violation for a live id
+# that is already connected, 1000 normal closure on idle eviction
+CLOSE_CODE_OVERLOADED = 1013
+CLOSE_CODE_DUPLICATE = 1008
+CLOSE_CODE_IDLE = 1000
+
+_live_sessions: Dict[str, Dict[str, Any]] = {}
+
+_live_stats = {
+    "admitted": 0,
+    "rejected": 0,
+    "rejected_duplicate": 0,
+    "evicted_idle": 0,
+    "released": 0,
+}
+
+
+def live_id_in_use(live_id: str) -> bool:
+    """Whether a connection with this client-side id is already open in this process."""
+    if any(entry["live_id"] == live_id for entry in _live_sessions.values()):
+        _live_stats["rejected_duplicate"] += 1
+        return True
+    return False
+
+
+def live_session_in_use(session_id: str) -> bool:
+    """Whether an open connection in this process is already attached to this ADK session."""
+    return any(entry["session"] and entry["session"][2] == session_id for entry in _live_sessions.values())
+
+
+def reserve_live_slot(live_id: str) -> Optional[str]:
+    """Claims one of the LIVE_MAX_SESSIONS slots for `live_id`, or returns None when at capacity.
+
+    The slot is taken synchronously, so concurrent handshakes cannot overshoot the cap.
+    """
+    if len(_live_sessions) >= LIVE_MAX_SESSIONS:
+        _live_stats["rejected"] += 1
+        return None
+    token = str(uuid.uuid4())
+    now = time.monotonic()
+    _live_sessions[token] = {"live_id": live_id, "started": now, "last_activity": now, "close": None, "session": None}
+    _live_stats["admitted"] += 1
+    return token
+
+
+def register_live_session(token: str, app_name: str, user_id: str, session_id: str, close: Callable[[int], Awaitable[None]]):
+    """Attaches the ADK session and a close callback (used for idle eviction) to a reserved slot."""
+    entry = _live_sessions.get(token)
+    if entry is not None:
+        entry["session"] = (app_name, user_id, session_id)
+        entry["close"] = close
+
+
+def touch_live_session(token: str):
+    entry = _live_sessions.get(token)
+    if entry is not None:
+        entry["last_activity"] = time.monotonic()
+
+
+async def release_live_session(token: str, session_service, delete: bool = True):
+    """Frees the slot and, unless `delete` is False, deletes the ADK session with its accumulated events."""
+    entry = _live_sessions.pop(token, None)
+    if entry is None:
+        return
+    _live_stats["released"] += 1
+    if delete and entry["session"] is not None:
+        app_name, user_id, session_id = entry["session"]
+        try:
+            await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        except Exception as e:
+            print(f"Live session cleanup failed for {session_id}: {e}")
+
+
+async def evict_idle_live_sessions():
+    """Background sweeper closing connections idle past LIVE_IDLE_TIMEOUT_SECONDS.
+
+    Closing the socket ends the connection's loops, whose teardown releases the session.
+    """
+    while True:
+        await asyncio.sleep(LIVE_SWEEP_INTERVAL_SECONDS)
+        cutoff = time.monotonic() - LIVE_IDLE_TIMEOUT_SECONDS
+        for token, entry in list(_live_sessions.items()):
+            if entry["last_activity"] < cutoff and entry["close"] is not None:
+                _live_stats["evicted_idle"] += 1
+                # Closed once; the slot stays claimed until the connection's own teardown releases it
+                close, entry["close"] = entry["close"], None
+                try:
+                    await close(CLOSE_CODE_IDLE)
+                except Exception as e:
+                    print(f"Idle live session close failed: {e}")
+
+
+async def get_live_session_report(session_service) -> Dict[str, Any]:
+    """Live session count and approximate memory, sized from each session's serialized state and events."""
+    now = time.monotonic()
+    sessions = []
+    total_bytes = 0
+    for entry in list(_live_sessions.values()):
+        events = 0
+        approx_bytes = 0
+        if entry["session"] is not None:
+            app_name, user_id, session_id = entry["session"]
+            session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            if session is not None:
+                events = len(session.events)
+                approx_bytes = len(session.model_dump_json())
+        total_bytes += approx_bytes
+        sessions.append({
+            "session_id": entry["session"][2] if entry["session"] else None,
+            "age_seconds": round(now - entry["started"], 1),
+            "idle_seconds": round(now - entry["last_activity"], 1),
+            "events": events,
+            "approx_bytes": approx_bytes,
+        })
+    return {
+        "count": len(_live_sessions),
+        "max_sessions": LIVE_MAX_SESSIONS,
+        "idle_timeout_seconds": LIVE_IDLE_TIMEOUT_SECONDS,
+        "approx_total_bytes": total_bytes,
+        "sessions": sessions,
+        **_live_stats,
+    }
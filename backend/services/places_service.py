@@ -1,10 +1,17 @@
 import os
+import copy
+import asyncio
+import hashlib
 import httpx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from services.http_client import get_http_client
+from services.redis_cache import register_l1_cache, get_cached_value, set_cached_value
+from services.single_flight import single_flight
+from services.geo import geohash_bounds, geohash_encode, geohash_cells_covering, haversine_m
 
 API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "YOUR_API_KEY_HERE")
 
-async def get_autocomplete_predictions(input_text: str) -> List[Dict[str, Any]]:
+async def get_autocomplete_predictions(input_text: str, session_token: str = None) -> List[Dict[str, Any]]:
     """Secure backend proxy for Google Places Autocomplete API to hide the API key."""
     url = "https://places.googleapis.com/v1/places:autocomplete"
     headers = {
@@ -12,58 +19,195 @@ async def get_autocomplete_predictions(input_text: str) -> List[Dict[str, Any]]:
         "Content-Type": "application/json"
     }
     payload = {"input": input_text}
+    if session_token:
+        payload["sessionToken"] = session_token
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("suggestions", [])
-        except Exception as e:
-            print(f"Error fetching autocomplete: {e}")
-            return []
-
-async def get_places_details(place_id: str) -> Dict[str, Any]:
-    """Retrieve details for a specific Google Place ID using Places API (New)."""
+    client = get_http_client("places")
+    try:
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("suggestions", [])
+    except Exception as e:
+        print(f"Error fetching autocomplete: {e}")
+        return []
+
+# Place Details cache: displayName/location/viewport for a place essentially never change
+DETAILS_FIELD_MASK = "displayName,location,viewport,formattedAddress,types"
+DETAILS_TTL_SECONDS = int(os.getenv("PLACE_DETAILS_TTL_DAYS", "30")) * 86400
+# Invalid IDs (e.g. the literal "places/string") are remembered briefly so they stop hitting the API.
+# Only errors about the place ID itself qualify: a bad key, quota or field mask must not poison every ID.
+DETAILS_NEGATIVE_TTL_SECONDS = int(os.getenv("PLACE_DETAILS_NEGATIVE_TTL_SECONDS", "3600"))
+
+register_l1_cache("place_details", max_entries=2048, max_bytes=8 * 1024 * 1024)
+
+_details_stats = {
+    "hits": 0,
+    "negative_hits": 0,
+    "misses": 0,
+    "upstream_errors": 0,
+}
+
+async def get_places_details(place_id: str, field_mask: str = DETAILS_FIELD_MASK) -> Dict[str, Any]:
+    """Retrieve details for a specific Google Place ID using Places API (New), cached per place and field mask."""
     # Clean the ID to remove any 'places/' prefixes that the autocomplete might return
     clean_id = place_id.replace("places/", "")
+    mask_key = hashlib.sha1(",".join(sorted(field_mask.split(","))).encode()).hexdigest()[:10]
+    cache_key = f"{clean_id}:{mask_key}"
+
+    cached = await get_cached_value("place_details", cache_key)
+    if cached is not None:
+        if cached.get("negative"):
+            _details_stats["negative_hits"] += 1
+            return {}
+        _details_stats["hits"] += 1
+        # L1 hands out its stored object; callers get their own copy to mutate
+        return copy.deepcopy(cached["details"])
+
+    _details_stats["misses"] += 1
+    # Concurrent lookups for the same place share one upstream request
+    details = await single_flight(f"place_details:{cache_key}", lambda: _fetch_places_details(clean_id, field_mask, cache_key))
+    return copy.deepcopy(details)
+
+def _is_invalid_place_id_error(response: httpx.Response) -> bool:
+    """404, or a 400 INVALID_ARGUMENT whose message is about the place ID."""
+    if response.status_code == 404:
+        return True
+    if response.status_code != 400:
+        return False
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return False
+    return error.get("status") == "INVALID_ARGUMENT" and "place id" in error.get("message", "").lower()
+
+async def _fetch_places_details(clean_id: str, field_mask: str, cache_key: str) -> Dict[str, Any]:
     url = f"https://places.googleapis.com/v1/places/{clean_id}"
     headers = {
         "X-Goog-Api-Key": API_KEY,
-        "X-Goog-FieldMask": "displayName,location,viewport,formattedAddress,types"
+        "X-Goog-FieldMask": field_mask
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            return {
-                "name": data.get("displayName", {}).get("text", ""),
-                "geometry": {
-                    "location": {
-                        "lat": data.get("location", {}).get("latitude"),
-                        "lng": data.get("location", {}).get("longitude")
-                    },
-                    "viewport": data.get("viewport")
-                },
-                "formatted_address": data.get("formattedAddress", ""),
-                "type": data.get("types", [""])[0] if data.get("types") else ""
-            }
-        except Exception as e:
-            print(f"Error fetching place details: {e}")
-            return {}
+    client = get_http_client("places")
+    try:
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+    except httpx.HTTPStatusError as e:
+        print(f"Error fetching place details: {e}")
+        _details_stats["upstream_errors"] += 1
+        if _is_invalid_place_id_error(e.response):
+            await set_cached_value("place_details", cache_key, {"negative": True}, DETAILS_NEGATIVE_TTL_SECONDS)
+        return {}
+    except Exception as e:
+        print(f"Error fetching place details: {e}")
+        _details_stats["upstream_errors"] += 1
+        return {}
+
+    details = {
+        "name": data.get("displayName", {}).get("text", ""),
+        "geometry": {
+            "location": {
+                "lat": data.get("location", {}).get("latitude"),
+                "lng": data.get("location", {}).get("longitude")
+            },
+            "viewport": data.get("viewport")
+        },
+        "formatted_address": data.get("formattedAddress", ""),
+        "type": data.get("types", [""])[0] if data.get("types") else ""
+    }
+    await set_cached_value("place_details", cache_key, {"details": details}, DETAILS_TTL_SECONDS)
+    return details
+
+# Spatial tile cache for searchNearby: stripped POIs are stored per geohash cell and circle
+# queries are answered from the union of covering cells. When any cell is missing or expired,
+# the query's own circle is fetched, so a miss costs the single call and returns the same
+# places as an uncached lookup. Cells are only cached from fetches below the result cap:
+# a capped fetch holds the most prominent POIs only, not the complete contents of its cells.
+NEARBY_TILE_PRECISION = int(os.getenv("NEARBY_TILE_PRECISION", "6"))
+NEARBY_MAX_TILES = int(os.getenv("NEARBY_MAX_TILES", "16"))
+NEARBY_TILE_TTL_SECONDS = int(os.getenv("NEARBY_TILE_TTL_HOURS", "24")) * 3600
+NEARBY_MAX_RESULTS = 20
+
+register_l1_cache("nearby_tile", max_entries=4096, max_bytes=16 * 1024 * 1024)
+
+_nearby_stats = {
+    "queries": 0,
+    "tile_hits": 0,
+    "tile_fetches": 0,
+    "upstream_calls": 0,
+    "truncated_fetches": 0,
+    "upstream_errors": 0,
+}
+
+def _tile_covers(tile: Any, lat: float, lng: float, radius: float) -> bool:
+    """True when a cached tile holds every POI of its cell that lies within the query circle.
+
+    A tile is complete for its whole cell (`within` is None) or only for the part of it inside
+    the circle it was fetched with, which must then contain the query circle.
+    """
+    if not isinstance(tile, dict):
+        return False
+    within = tile.get("within")
+    if within is None:
+        return True
+    center_lat, center_lng, fetched_radius = within
+    return haversine_m(lat, lng, center_lat, center_lng) + radius <= fetched_radius
 
 async def get_nearby_places(lat: float, lng: float, radius: float = 1000.0) -> List[Dict[str, Any]]:
-    """Retrieve an array of points of interest around the coordinates using Places API (New)."""
+    """Retrieve the most prominent points of interest around the coordinates using Places API (New)."""
+    _nearby_stats["queries"] += 1
+    precision = NEARBY_TILE_PRECISION
+    cells = geohash_cells_covering(lat, lng, radius, precision)
+    # Large radii fall back to coarser tiles so the merged union stays small
+    while len(cells) > NEARBY_MAX_TILES and precision > 1:
+        precision -= 1
+        cells = geohash_cells_covering(lat, lng, radius, precision)
+
+    cached = await asyncio.gather(*[get_cached_value("nearby_tile", cell) for cell in cells])
+    missing = [cell for cell, tile in zip(cells, cached) if not _tile_covers(tile, lat, lng, radius)]
+    _nearby_stats["tile_hits"] += len(cells) - len(missing)
+    if missing:
+        _nearby_stats["tile_fetches"] += len(missing)
+        flight_key = f"nearby_circle:{lat:.6f},{lng:.6f},{radius:.0f}"
+        places = await single_flight(flight_key, lambda: _fetch_nearby_circle(lat, lng, radius, missing))
+        return [_public_place(place) for place in places[:NEARBY_MAX_RESULTS]]
+
+    seen = set()
+    nearby = []
+    for tile in cached:
+        for place in tile["places"]:
+            key = (place["name"], place["lat"], place["lng"])
+            if key in seen:
+                continue
+            seen.add(key)
+            if haversine_m(lat, lng, place["lat"], place["lng"]) <= radius:
+                nearby.append(place)
+
+    # Tiles come from separate fetches whose upstream rankings don't compare; review volume
+    # is the popularity signal they share (rating breaks ties)
+    nearby.sort(key=lambda place: (-place.get("rating_count", 0), -(place.get("rating") or 0.0)))
+    return [_public_place(place) for place in nearby[:NEARBY_MAX_RESULTS]]
+
+def _public_place(place: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in place.items() if k != "rating_count"}
+
+async def _fetch_nearby_circle(lat: float, lng: float, radius: float, cells: List[str]) -> List[Dict[str, Any]]:
+    """Fetches the POIs within the query circle in upstream (popularity) order and caches `cells` from them.
+
+    Only a fetch below the result cap is complete. Cells inside the circle are then cached as
+    complete; cells it only partly covers are cached as complete within the circle.
+    """
+    _nearby_stats["upstream_calls"] += 1
     url = "https://places.googleapis.com/v1/places:searchNearby"
     headers = {
         "X-Goog-Api-Key": API_KEY,
-        "X-Goog-FieldMask": "places.displayName,places.location,places.rating,places.priceLevel,places.primaryType",
+        "X-Goog-FieldMask": "places.displayName,places.location,places.rating,places.userRatingCount,places.priceLevel,places.primaryType",
         "Content-Type": "application/json"
     }
     
     payload = {
+        "maxResultCount": NEARBY_MAX_RESULTS,
         "locationRestriction": {
             "circle": {
                 "center": {
@@ -75,14 +219,15 @@ async def get_nearby_places(lat: float, lng: float, radius: float = 1000.0) -> L
         }
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            places_result = response.json()
-        except Exception as e:
-            print(f"Error fetching nearby places: {e}")
-            return []
+    client = get_http_client("places")
+    try:
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        places_result = response.json()
+    except Exception as e:
+        print(f"Error fetching nearby places: {e}")
+        _nearby_stats["upstream_errors"] += 1
+        return []
     
     results = places_result.get("places", [])
     
@@ -92,16 +237,42 @@ async def get_nearby_places(lat: float, lng: float, radius: float = 1000.0) -> L
         p_type = place.get("primaryType", "")
         if p_type in ["locality", "political", "neighborhood", "administrative_area_level_1", "administrative_area_level_2"]:
             continue
-            
+        place_lat = place.get("location", {}).get("latitude")
+        place_lng = place.get("location", {}).get("longitude")
+        if place_lat is None or place_lng is None:
+            continue
         stripped_data.append({
             "name": place.get("displayName", {}).get("text", ""),
-            "lat": place.get("location", {}).get("latitude"),
-            "lng": place.get("location", {}).get("longitude"),
+            "lat": place_lat,
+            "lng": place_lng,
             "rating": place.get("rating", 0.0),
             "price_level": place.get("priceLevel", "PRICE_LEVEL_UNSPECIFIED"),
-            "primary_type": p_type
+            "primary_type": p_type,
+            "rating_count": place.get("userRatingCount", 0),
         })
-        
+
+    if len(results) >= NEARBY_MAX_RESULTS:
+        # Dense area: more POIs exist than one call returns, so no cell can be cached as complete
+        _nearby_stats["truncated_fetches"] += 1
+        return stripped_data
+
+    precision = len(cells[0])
+    tiles = {cell: [] for cell in cells}
+    for place in stripped_data:
+        cell = geohash_encode(place["lat"], place["lng"], precision)
+        if cell in tiles:
+            tiles[cell].append(place)
+
+    writes = []
+    for cell, places in tiles.items():
+        south, west, north, east = geohash_bounds(cell)
+        inside = all(
+            haversine_m(lat, lng, corner_lat, corner_lng) <= radius
+            for corner_lat in (south, north) for corner_lng in (west, east)
+        )
+        tile = {"places": places, "within": None if inside else [lat, lng, radius]}
+        writes.append(set_cached_value("nearby_tile", cell, tile, NEARBY_TILE_TTL_SECONDS))
+    await asyncio.gather(*writes)
     return stripped_data
 
 def format_context_payload(location_details: Dict, nearby_places: List[Dict]) -> str:
@@ -130,7 +301,7 @@ def format_context_payload(location_details: Dict, nearby_places: List[Dict]) ->
         
     return payload
 
-async def contextual_places_search(lat: float, lng: float, radius_miles: float, keywords: List[str]) -> Dict[str, Any]:
+async def contextual_places_search(lat: float, lng: float, radius_miles: float, keywords: List[str], max_results: int = 5) -> Dict[str, Any]:
     """Search Google Places using keywords extracted by Gemini, restricted by radius."""
     url = "https://places.googleapis.com/v1/places:searchText"
     headers = {
@@ -168,17 +339,17 @@ async def contextual_places_search(lat: float, lng: float, radius_miles: float,
                 }
             }
         },
-        "maxResultCount": 5
+        "maxResultCount": max_results
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            places_result = response.json()
-        except Exception as e:
-            print(f"Error fetching contextual places: {e}"); print(getattr(e, "response", type("obj", (object,), {"text": ""})).text)
-            return {}
+    client = get_http_client("places")
+    try:
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        places_result = response.json()
+    except Exception as e:
+        print(f"Error fetching contextual places: {e}"); print(getattr(e, "response", type("obj", (object,), {"text": ""})).text)
+        return {}
             
     results = places_result.get("places", [])
     if not results:
@@ -210,32 +381,72 @@ async def reverse_geocode(lat: float, lng: float) -> dict:
         "result_type": "locality|neighborhood|sublocality",
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            results = data.get("results", [])
-            if not results:
-                return {}
-            first = results[0]
-            return {
-                "place_id": first.get("place_id", ""),
-                "formatted_address": first.get("formatted_address", ""),
-            }
-        except Exception as e:
-            print(f"Error reverse geocoding: {e}")
+    client = get_http_client("maps")
+    try:
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        results = data.get("results", [])
+        if not results:
             return {}
+        first = results[0]
+        return {
+            "place_id": first.get("place_id", ""),
+            "formatted_address": first.get("formatted_address", ""),
+        }
+    except Exception as e:
+        print(f"Error reverse geocoding: {e}")
+        return {}
+
 
+# Route cache: walking routes between the same two spots are stable, so endpoints are snapped
+# to a ~11 m grid (4 decimal places) and the encoded polyline is kept for a week. Matrix entries
+# (distance/duration per origin-destination pair) share the namespace under a "matrix:" prefix.
+ROUTE_SNAP_DECIMALS = int(os.getenv("ROUTE_SNAP_DECIMALS", "4"))
+ROUTE_TTL_SECONDS = int(os.getenv("ROUTE_CACHE_TTL_DAYS", "7")) * 86400
 
-async def get_directions(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float) -> str:
-    """Fetch routing directions using Google Maps Routes API v2."""
+register_l1_cache("route", max_entries=4096, max_bytes=16 * 1024 * 1024)
+
+_routes_stats = {
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "matrix_cache_hits": 0,
+    "matrix_cache_misses": 0,
+    "matrix_requests": 0,
+    "matrix_errors": 0,
+    "unreachable_filtered": 0,
+    "polyline_requests": 0,
+    "polyline_timeouts": 0,
+}
+
+
+def _route_cache_key(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float, travel_mode: str) -> str:
+    d = ROUTE_SNAP_DECIMALS
+    return f"{travel_mode}:{origin_lat:.{d}f},{origin_lng:.{d}f}:{dest_lat:.{d}f},{dest_lng:.{d}f}"
+
+
+async def get_directions(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float, travel_mode: str = "WALK") -> str:
+    """Fetch routing directions using Google Maps Routes API v2, cached per snapped endpoints and travel mode."""
+    cache_key = _route_cache_key(origin_lat, origin_lng, dest_lat, dest_lng, travel_mode)
+    cached = await get_cached_value("route", cache_key)
+    if cached is not None:
+        _routes_stats["cache_hits"] += 1
+        return cached["encoded_polyline"]
+
+    _routes_stats["cache_misses"] += 1
+    return await single_flight(
+        f"route:{cache_key}",
+        lambda: _fetch_directions(origin_lat, origin_lng, dest_lat, dest_lng, travel_mode, cache_key),
+    )
+
+
+async def _fetch_directions(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float, travel_mode: str, cache_key: str) -> str:
     url = "https://routes.googleapis.com/directions/v2:computeRoutes"
     
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": API_KEY,
-        "X-Goog-FieldMask": "routes.polyline.encodedPolyline"
+        "X-Goog-FieldMask": "routes.polyline.encodedPolyline,routes.duration,routes.distanceMeters"
     }
 
     payload = {
@@ -255,22 +466,171 @@ async def get_directions(origin_lat: float, origin_lng: float, dest_lat: float,
                 }
             }
         },
-        "travelMode": "WALK"
+        "travelMode": travel_mode
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+    client = get_http_client("routes")
+    try:
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        data = response.json()
             
-            if "routes" in data and len(data["routes"]) > 0:
-                return data["routes"][0].get("polyline", {}).get("encodedPolyline", "")
-            else:
-                print(f"Routes API returned no routes or error: {data}")
-                return ""
-        except Exception as e:
-            print(f"Error fetching directions via Routes API: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Response Body: {e.response.text}")
+        if "routes" in data and len(data["routes"]) > 0:
+            route = data["routes"][0]
+            encoded = route.get("polyline", {}).get("encodedPolyline", "")
+            if encoded:
+                await set_cached_value("route", cache_key, {"encoded_polyline": encoded}, ROUTE_TTL_SECONDS)
+                # The same response answers later matrix lookups for this pair
+                await set_cached_value("route", f"matrix:{cache_key}", {
+                    "distance_meters": route.get("distanceMeters"),
+                    "duration_seconds": _parse_duration(route.get("duration", "")),
+                    "reachable": True,
+                }, ROUTE_TTL_SECONDS)
+            return encoded
+        else:
+            print(f"Routes API returned no routes or error: {data}")
             return ""
+    except Exception as e:
+        print(f"Error fetching directions via Routes API: {e}")
+        if hasattr(e, 'response') and e.response:
+            print(f"Response Body: {e.response.text}")
+        return ""
+
+
+# Proximity routing: one matrix call ranks every candidate, then polylines are fetched only for the shown ones
+ROUTE_POLYLINE_TIMEOUT_SECONDS = float(os.getenv("ROUTE_POLYLINE_TIMEOUT_SECONDS", "3.0"))
+
+def _parse_duration(value: Optional[str]) -> Optional[int]:
+    """Whole seconds from a Routes API protobuf Duration string (e.g. "734s"), or None if missing or malformed."""
+    try:
+        return round(float(str(value).rstrip("s")))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+async def compute_route_matrix(origin_lat: float, origin_lng: float, destinations: List[tuple], travel_mode: str = "WALK") -> List[Dict[str, Any]]:
+    """Walking distance and duration from one origin to many destinations, cached per snapped pair.
+
+    Returns one entry per destination, in order: {"distance_meters", "duration_seconds", "reachable"},
+    or None for destinations whose entry is neither cached nor returned by the matrix request.
+    Only uncached destinations are sent, in a single Routes matrix call.
+    """
+    keys = [f"matrix:{_route_cache_key(origin_lat, origin_lng, lat, lng, travel_mode)}" for lat, lng in destinations]
+    matrix = list(await asyncio.gather(*[get_cached_value("route", key) for key in keys]))
+    missing = [i for i, entry in enumerate(matrix) if entry is None]
+    _routes_stats["matrix_cache_hits"] += len(matrix) - len(missing)
+    _routes_stats["matrix_cache_misses"] += len(missing)
+    if missing:
+        fetched = await single_flight(
+            "route_matrix:" + "|".join(keys[i] for i in missing),
+            lambda: _fetch_route_matrix(origin_lat, origin_lng, [destinations[i] for i in missing], [keys[i] for i in missing], travel_mode),
+        )
+        for i, entry in zip(missing, fetched):
+            matrix[i] = entry
+    return matrix
+
+
+async def _fetch_route_matrix(origin_lat: float, origin_lng: float, destinations: List[tuple], keys: List[str], travel_mode: str) -> List[Dict[str, Any]]:
+    url = "https://routes.googleapis.com/distanceMatrix/v2:computeRouteMatrix"
+    headers = {
+        "Content-Type": "application/json",
+        "X-Goog-Api-Key": API_KEY,
+        "X-Goog-FieldMask": "originIndex,destinationIndex,status,duration,distanceMeters,condition"
+    }
+    payload = {
+        "origins": [{"waypoint": {"location": {"latLng": {"latitude": origin_lat, "longitude": origin_lng}}}}],
+        "destinations": [
+            {"waypoint": {"location": {"latLng": {"latitude": lat, "longitude": lng}}}}
+            for lat, lng in destinations
+        ],
+        "travelMode": travel_mode,
+    }
+
+    client = get_http_client("routes")
+    _routes_stats["matrix_requests"] += 1
+    try:
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        elements = response.json()
+    except Exception as e:
+        _routes_stats["matrix_errors"] += 1
+        print(f"Error computing route matrix via Routes API: {e}")
+        return [None] * len(destinations)
+
+    matrix = [None] * len(destinations)
+    for element in elements:
+        index = element.get("destinationIndex", 0)
+        if not 0 <= index < len(matrix):
+            continue
+        # An element that failed with an error status, or carries no condition, is unknown rather
+        # than unreachable: it stays None and is retried next time. Only ROUTE_NOT_FOUND rules a destination out.
+        condition = element.get("condition")
+        if element.get("status", {}).get("code") or condition not in ("ROUTE_EXISTS", "ROUTE_NOT_FOUND"):
+            continue
+        matrix[index] = {
+            "distance_meters": element.get("distanceMeters"),
+            "duration_seconds": _parse_duration(element.get("duration", "")),
+            "reachable": condition == "ROUTE_EXISTS",
+        }
+    await asyncio.gather(*[
+        set_cached_value("route", key, entry, ROUTE_TTL_SECONDS) for key, entry in zip(keys, matrix) if entry is not None
+    ])
+    return matrix
+
+
+async def _get_directions_bounded(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float) -> str:
+    _routes_stats["polyline_requests"] += 1
+    try:
+        return await asyncio.wait_for(get_directions(origin_lat, origin_lng, dest_lat, dest_lng), ROUTE_POLYLINE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        _routes_stats["polyline_timeouts"] += 1
+        print(f"Routes API polyline timed out after {ROUTE_POLYLINE_TIMEOUT_SECONDS}s")
+        return ""
+
+
+async def route_candidates(origin_lat: float, origin_lng: float, candidates: List[Dict[str, Any]], max_results: int) -> List[Dict[str, Any]]:
+    """Ranks candidates by walking time, drops unreachable ones, and attaches polylines to the top `max_results`.
+
+    Each returned candidate gains `route` (distance/duration, or None if it is unknown) and
+    `encoded_polyline` ("" when the route could not be fetched, so callers fall back to a straight line).
+    Candidates whose walking time is unknown keep their search-order position; if the matrix call
+    fails they all do.
+    """
+    if not candidates:
+        return []
+    matrix = await compute_route_matrix(origin_lat, origin_lng, [(c["lat"], c["lng"]) for c in candidates])
+
+    kept = []
+    for candidate, route in zip(candidates, matrix):
+        if route is not None and not route["reachable"]:
+            _routes_stats["unreachable_filtered"] += 1
+            continue
+        kept.append({**candidate, "route": route})
+
+    def known(candidate):
+        return candidate["route"] is not None and candidate["route"]["duration_seconds"] is not None
+
+    # Timed candidates are sorted by duration into the slots they occupy; the others stay put
+    timed = iter(sorted((c for c in kept if known(c)), key=lambda c: c["route"]["duration_seconds"]))
+    ranked = [next(timed) if known(c) else c for c in kept]
+    shown = ranked[:max_results]
+
+    polylines = await asyncio.gather(*[
+        _get_directions_bounded(origin_lat, origin_lng, c["lat"], c["lng"]) for c in shown
+    ])
+    for candidate, encoded in zip(shown, polylines):
+        candidate["encoded_polyline"] = encoded
+    return shown
+
+
+def get_places_metrics() -> Dict[str, Any]:
+    """Place Details, nearby tile cache and routing counters for the metrics endpoint."""
+    lookups = _details_stats["hits"] + _details_stats["negative_hits"] + _details_stats["misses"]
+    hit_rate = (_details_stats["hits"] + _details_stats["negative_hits"]) / lookups if lookups else 0.0
+    tile_lookups = _nearby_stats["tile_hits"] + _nearby_stats["tile_fetches"]
+    tile_hit_rate = _nearby_stats["tile_hits"] / tile_lookups if tile_lookups else 0.0
+    return {
+        "details": {**_details_stats, "hit_rate": round(hit_rate, 4)},
+        "nearby_tiles": {**_nearby_stats, "hit_rate": round(tile_hit_rate, 4)},
+        "routes": dict(_routes_stats),
+    }
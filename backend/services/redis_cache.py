@@ -1,29 +1,290 @@
 import os
 import json
+import time
+import uuid
+import asyncio
 import redis.asyncio as redis
-from typing import Optional, Dict
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from typing import Any, Optional, Dict
 
-# Architecturally mandated Redis integration with 72-hour TTL
+from services.lru_cache import LRUCache
+from services.cache_codec import encode_payload, decode_payload, payload_size
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))
+
+# Architecturally mandated Redis integration with 72-hour TTL.
+# Values are binary cache_codec payloads, so responses are not decoded to str.
 redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"), 
+    host=REDIS_HOST, 
     port=6379, 
     db=0, 
-    decode_responses=True
+    decode_responses=False,
+    socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+    socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0")),
+    # Fail fast and let the health circuit decide when to try again
+    retry=Retry(NoBackoff(), 0),
 )
 
-async def get_cached_profile(place_id: str) -> Optional[Dict]:
-    """Retrieve validated JSON payload from Redis using exact Google Places ID."""
+# Pub/sub blocks indefinitely waiting for messages, so it gets a client without a read timeout
+_pubsub_client = redis.Redis(
+    host=REDIS_HOST,
+    port=6379,
+    db=0,
+    decode_responses=True,
+    socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+)
+
+# --- Redis health circuit ---
+# After a failure Redis is skipped for an exponentially growing window, so an outage
+# degrades to L1-only instead of paying a connection attempt on every request.
+REDIS_RETRY_BASE_SECONDS = float(os.getenv("REDIS_RETRY_BASE_SECONDS", "1.0"))
+REDIS_RETRY_MAX_SECONDS = float(os.getenv("REDIS_RETRY_MAX_SECONDS", "30.0"))
+
+_circuit = {"failures": 0, "open_until": 0.0, "skipped_calls": 0}
+
+def redis_available() -> bool:
+    """False while the circuit is open after a recent Redis failure."""
+    if time.monotonic() < _circuit["open_until"]:
+        _circuit["skipped_calls"] += 1
+        return False
+    return True
+
+def _record_redis_failure(action: str, error: Exception):
+    if time.monotonic() < _circuit["open_until"]:
+        # Concurrent calls that were already in flight when the circuit opened
+        return
+    _circuit["failures"] += 1
+    backoff = min(REDIS_RETRY_BASE_SECONDS * 2 ** (_circuit["failures"] - 1), REDIS_RETRY_MAX_SECONDS)
+    _circuit["open_until"] = time.monotonic() + backoff
+    print(f"Redis {action} failed ({error}); serving L1-only for {backoff:.1f}s")
+
+def _record_redis_success():
+    _circuit["failures"] = 0
+    _circuit["open_until"] = 0.0
+
+# --- L1 in-process caches, one per key namespace ---
+_l1_caches: Dict[str, LRUCache] = {}
+
+def register_l1_cache(namespace: str, max_entries: int, max_bytes: int) -> LRUCache:
+    """Creates the L1 cache sitting in front of Redis keys under `namespace:`."""
+    cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+    _l1_caches[namespace] = cache
+    return cache
+
+profile_l1 = register_l1_cache(
+    "profile",
+    max_entries=int(os.getenv("PROFILE_L1_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("PROFILE_L1_MAX_BYTES", str(32 * 1024 * 1024))),
+)
+
+# Used when Redis reports no expiry or is unavailable
+DEFAULT_L1_TTL_SECONDS = 3600
+
+# --- Payload schema versions and migrations ---
+# Bump a namespace's version when its payload shape changes and register a migration from the
+# previous version, so existing entries are upgraded in place rather than silently regenerated.
+_schema_versions: Dict[str, int] = {}
+_migrations: Dict[tuple, Any] = {}
+
+def register_schema(namespace: str, version: int):
+    _schema_versions[namespace] = version
+
+def register_migration(namespace: str, from_version: int):
+    """Decorator registering a payload upgrade from `from_version` to `from_version + 1`."""
+    def decorator(func):
+        _migrations[(namespace, from_version)] = func
+        return func
+    return decorator
+
+def _migrate(namespace: str, value: Any, version: int) -> Optional[Any]:
+    """Upgrades a payload to the current schema, or None if no migration path exists."""
+    target = _schema_versions.get(namespace, 1)
+    while version < target:
+        migration = _migrations.get((namespace, version))
+        if migration is None:
+            return None
+        value = migration(value)
+        version += 1
+    return value if version == target else None
+
+# Profile wrapper: {"profile_data", "viewport", "location", "weather", "generated_at"[, "visualization_plan"]}
+register_schema("profile", 2)
+
+@register_migration("profile", 0)
+def _profile_from_legacy_json(payload: dict) -> dict:
+    # Pre-header entries were plain JSON of the same wrapper; only the encoding changes
+    return payload
+
+@register_migration("profile", 1)
+def _profile_add_generated_at(payload: dict) -> dict:
+    # Age unknown: the entry is served as stale and refreshed in the background
+    return {**payload, "generated_at": None}
+
+async def get_cached_value(namespace: str, key: str) -> Optional[Any]:
+    """Two-tier read: L1 first, then Redis, filling L1 with the Redis entry's remaining TTL."""
+    l1 = _l1_caches.get(namespace)
+    if l1 is not None:
+        value = l1.get(key)
+        if value is not None:
+            return value
+    if not redis_available():
+        return None
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(f"{namespace}:{key}")
+            pipe.pttl(f"{namespace}:{key}")
+            data, pttl = await pipe.execute()
+        _record_redis_success()
+    except Exception as e:
+        _record_redis_failure("read", e)
+        return None
+    if not data:
+        return None
     try:
-        data = await redis_client.get(f"profile:{place_id}")
-        return json.loads(data) if data else None
+        value, version = decode_payload(data)
     except Exception as e:
-        print(f"Redis cache miss/error: {e}")
+        print(f"Unreadable cache entry {namespace}:{key}: {e}")
         return None
+    if version != _schema_versions.get(namespace, 1):
+        value = _migrate(namespace, value, version)
+        if value is None:
+            return None
+        data = await _rewrite_migrated(namespace, key, value, pttl)
+    if l1 is not None:
+        ttl_seconds = pttl / 1000 if pttl and pttl > 0 else DEFAULT_L1_TTL_SECONDS
+        l1.set(key, value, ttl_seconds, size=payload_size(data))
+    return value
+
+async def _rewrite_migrated(namespace: str, key: str, value: Any, pttl: int) -> bytes:
+    """Persists a migrated payload in the current encoding, keeping the entry's remaining TTL."""
+    data = encode_payload(value, _schema_versions.get(namespace, 1))
+    try:
+        if pttl and pttl > 0:
+            await redis_client.set(f"{namespace}:{key}", data, px=pttl)
+        else:
+            await redis_client.set(f"{namespace}:{key}", data)
+    except Exception as e:
+        _record_redis_failure("migration write", e)
+    return data
+
+async def set_cached_value(namespace: str, key: str, value: Any, ttl_seconds: int):
+    """Two-tier write: L1 always, Redis when reachable, then tell other workers to drop their L1 copy."""
+    data = encode_payload(value, _schema_versions.get(namespace, 1))
+    l1 = _l1_caches.get(namespace)
+    if l1 is not None:
+        l1.set(key, value, ttl_seconds, size=payload_size(data))
+    if not redis_available():
+        return
+    try:
+        await redis_client.setex(f"{namespace}:{key}", ttl_seconds, data)
+        await _publish_invalidation(namespace, key)
+        _record_redis_success()
+    except Exception as e:
+        _record_redis_failure("write", e)
+
+async def get_cached_profile(place_id: str) -> Optional[Dict]:
+    """Retrieve validated JSON payload from L1 or Redis using exact Google Places ID."""
+    return await get_cached_value("profile", place_id)
 
 async def set_cached_profile(place_id: str, profile_data: dict, ttl_hours: int = 72):
     """Store generated Gemini output with extreme token efficiency logic."""
+    await set_cached_value("profile", place_id, profile_data, ttl_hours * 3600)
+
+# --- Cross-worker L1 invalidation over Redis pub/sub ---
+INVALIDATION_CHANNEL = "cache:invalidate"
+WORKER_ID = uuid.uuid4().hex
+
+async def _publish_invalidation(namespace: str, key: str):
+    message = json.dumps({"namespace": namespace, "key": key, "origin": WORKER_ID})
+    await redis_client.publish(INVALIDATION_CHANNEL, message)
+
+async def listen_for_invalidations():
+    """Long-running task evicting L1 entries that another worker has rewritten."""
+    missed_messages = False
+    while True:
+        remaining = _circuit["open_until"] - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        pubsub = _pubsub_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            if missed_messages:
+                # Invalidations may have been published while we were disconnected
+                for cache in _l1_caches.values():
+                    cache.clear()
+                missed_messages = False
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                payload = json.loads(message["data"])
+                if payload.get("origin") == WORKER_ID:
+                    continue
+                cache = _l1_caches.get(payload.get("namespace"))
+                if cache is not None:
+                    cache.delete(payload.get("key"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            missed_messages = True
+            _record_redis_failure("pub/sub", e)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+def get_cache_metrics() -> Dict[str, Any]:
+    """L1 statistics per namespace plus the Redis circuit state."""
+    return {
+        "l1": {namespace: cache.stats() for namespace, cache in _l1_caches.items()},
+        "redis": {
+            "available": time.monotonic() >= _circuit["open_until"],
+            "consecutive_failures": _circuit["failures"],
+            "skipped_calls": _circuit["skipped_calls"],
+        },
+    }
+
+# Compare-and-delete so a worker can only release the lock it still owns
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Token handed out when Redis is unreachable: in-process single-flight is then the only guard
+LOCAL_LOCK_TOKEN = "local"
+
+async def acquire_generation_lock(place_id: str, ttl_seconds: int) -> Optional[str]:
+    """Try to become the one worker generating this profile; returns the lock token or None if held elsewhere."""
+    if not redis_available():
+        return LOCAL_LOCK_TOKEN
+    token = uuid.uuid4().hex
+    try:
+        acquired = await redis_client.set(f"lock:profile:{place_id}", token, nx=True, ex=ttl_seconds)
+        _record_redis_success()
+        return token if acquired else None
+    except Exception as e:
+        _record_redis_failure("lock", e)
+        return LOCAL_LOCK_TOKEN
+
+async def release_generation_lock(place_id: str, token: str):
+    """Release the generation lock if this worker still holds it."""
+    if token == LOCAL_LOCK_TOKEN or not redis_available():
+        return
+    try:
+        await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:profile:{place_id}", token)
+    except Exception as e:
+        _record_redis_failure("unlock", e)
+
+async def is_generation_locked(place_id: str) -> bool:
+    """Whether another worker still holds the generation lock for this profile."""
+    if not redis_available():
+        return False
     try:
-        ttl_seconds = ttl_hours * 3600
-        await redis_client.setex(f"profile:{place_id}", ttl_seconds, json.dumps(profile_data))
+        return bool(await redis_client.exists(f"lock:profile:{place_id}"))
     except Exception as e:
-        print(f"Failed to set Redis cache: {e}")
+        _record_redis_failure("lock check", e)
+        return False
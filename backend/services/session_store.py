@@ -0,0 +1,232 @@
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+try:
+    from google.adk.errors.already_exists_error import AlreadyExistsError
+except ImportError:  # google-adk releases before the error type existed
+    class AlreadyExistsError(Exception):
+        """Raised when creating a session whose id is already taken."""
+
+from services.cache_codec import encode_payload, decode_payload
+from services.redis_cache import redis_client
+
+# "memory" keeps sessions in this process; "redis" shares them across workers and hosts
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+# Idle sessions expire this long after their last event
+SESSION_TTL_SECONDS = int(os.getenv("ADK_SESSION_TTL_SECONDS", str(6 * 3600)))
+# Only the most recent events are kept per session; state carries everything older
+SESSION_MAX_EVENTS = int(os.getenv("ADK_SESSION_MAX_EVENTS", "500"))
+SESSION_SCHEMA_VERSION = 1
+KEY_PREFIX = "adk"
+
+
+def _compact_event(event: Event) -> Dict[str, Any]:
+    """Event as JSON-safe data without defaults or raw audio; transcripts carry the spoken content."""
+    data = event.model_dump(mode="json", exclude_none=True, exclude_defaults=True)
+    for part in data.get("content", {}).get("parts", []):
+        inline = part.get("inline_data")
+        if inline and inline.get("mime_type", "").startswith("audio/"):
+            inline.pop("data", None)
+    return data
+
+
+class RedisSessionService(BaseSessionService):
+    """ADK session service storing sessions in Redis so any worker can serve (or resume) them.
+
+    Per session: a hash of state fields and a capped list of compact events, both sharing the
+    session TTL, which every append refreshes. `app:` and `user:` state live in shared hashes,
+    as with InMemorySessionService.
+    """
+
+    def __init__(self, client=redis_client, ttl_seconds: int = SESSION_TTL_SECONDS, max_events: int = SESSION_MAX_EVENTS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_events = max_events
+
+    @staticmethod
+    def _key(kind: str, *parts: str) -> str:
+        return ":".join((KEY_PREFIX, kind, *parts))
+
+    def _session_keys(self, app_name: str, user_id: str, session_id: str):
+        return (
+            self._key("meta", app_name, user_id, session_id),
+            self._key("state", app_name, user_id, session_id),
+            self._key("events", app_name, user_id, session_id),
+        )
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return encode_payload(value, SESSION_SCHEMA_VERSION)
+
+    @staticmethod
+    def _decode(raw: bytes) -> Any:
+        return decode_payload(raw)[0]
+
+    def _decode_hash(self, raw: Dict[bytes, bytes]) -> Dict[str, Any]:
+        return {field.decode(): self._decode(value) for field, value in raw.items()}
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        now = time.time()
+        meta_key, state_key, events_key = self._session_keys(app_name, user_id, session_id)
+        session_state, app_delta, user_delta = self._split_state(state or {})
+
+        # Claiming the meta key first makes creation fail instead of overwriting a live session
+        claimed = await self.client.set(meta_key, self._encode({"last_update_time": now}), ex=self.ttl_seconds, nx=True)
+        if not claimed:
+            raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+
+        pipe = self.client.pipeline(transaction=True)
+        # Leftovers of an expired session with the same id
+        pipe.delete(state_key, events_key)
+        if session_state:
+            pipe.hset(state_key, mapping={k: self._encode(v) for k, v in session_state.items()})
+            pipe.expire(state_key, self.ttl_seconds)
+        self._queue_shared_state(pipe, app_name, user_id, app_delta, user_delta)
+        pipe.sadd(self._key("index", app_name, user_id), session_id)
+        pipe.expire(self._key("index", app_name, user_id), self.ttl_seconds)
+        await pipe.execute()
+
+        session = Session(app_name=app_name, user_id=user_id, id=session_id, state=session_state, last_update_time=now)
+        return await self._merge_shared_state(session)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        meta_key, state_key, events_key = self._session_keys(app_name, user_id, session_id)
+        start = -config.num_recent_events if config and config.num_recent_events else 0
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(meta_key)
+        pipe.hgetall(state_key)
+        pipe.lrange(events_key, start, -1)
+        raw_meta, raw_state, raw_events = await pipe.execute()
+        if raw_meta is None:
+            return None
+
+        events = [Event.model_validate(self._decode(raw)) for raw in raw_events]
+        if config and config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=self._decode_hash(raw_state),
+            events=events,
+            last_update_time=self._decode(raw_meta)["last_update_time"],
+        )
+        return await self._merge_shared_state(session)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        session_ids = await self.client.smembers(self._key("index", app_name, user_id))
+        sessions = []
+        for raw_id in session_ids:
+            session_id = raw_id.decode()
+            meta_key, state_key, _ = self._session_keys(app_name, user_id, session_id)
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(meta_key)
+            pipe.hgetall(state_key)
+            raw_meta, raw_state = await pipe.execute()
+            if raw_meta is None:
+                # Expired; drop it from the index lazily
+                await self.client.srem(self._key("index", app_name, user_id), session_id)
+                continue
+            session = Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state=self._decode_hash(raw_state),
+                last_update_time=self._decode(raw_meta)["last_update_time"],
+            )
+            sessions.append(await self._merge_shared_state(session))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(*self._session_keys(app_name, user_id, session_id))
+        pipe.srem(self._key("index", app_name, user_id), session_id)
+        await pipe.execute()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session, event)
+        session.last_update_time = event.timestamp
+
+        meta_key, state_key, events_key = self._session_keys(session.app_name, session.user_id, session.id)
+        delta = event.actions.state_delta if event.actions and event.actions.state_delta else {}
+        session_delta, app_delta, user_delta = self._split_state(delta)
+
+        # One round trip: state delta, capped event append and TTL refresh
+        pipe = self.client.pipeline(transaction=True)
+        if session_delta:
+            pipe.hset(state_key, mapping={k: self._encode(v) for k, v in session_delta.items()})
+        self._queue_shared_state(pipe, session.app_name, session.user_id, app_delta, user_delta)
+        pipe.rpush(events_key, self._encode(_compact_event(event)))
+        pipe.ltrim(events_key, -self.max_events, -1)
+        pipe.set(meta_key, self._encode({"last_update_time": session.last_update_time}), ex=self.ttl_seconds)
+        pipe.expire(state_key, self.ttl_seconds)
+        pipe.expire(events_key, self.ttl_seconds)
+        pipe.expire(self._key("index", session.app_name, session.user_id), self.ttl_seconds)
+        await pipe.execute()
+        return event
+
+    @staticmethod
+    def _split_state(state: Dict[str, Any]):
+        """Splits a state dict into (session, app, user) parts, dropping temp: keys."""
+        session_state, app_state, user_state = {}, {}, {}
+        for key, value in state.items():
+            if key.startswith(State.APP_PREFIX):
+                app_state[key[len(State.APP_PREFIX):]] = value
+            elif key.startswith(State.USER_PREFIX):
+                user_state[key[len(State.USER_PREFIX):]] = value
+            elif not key.startswith(State.TEMP_PREFIX):
+                session_state[key] = value
+        return session_state, app_state, user_state
+
+    def _queue_shared_state(self, pipe, app_name: str, user_id: str, app_delta: Dict[str, Any], user_delta: Dict[str, Any]):
+        if app_delta:
+            pipe.hset(self._key("app_state", app_name), mapping={k: self._encode(v) for k, v in app_delta.items()})
+        if user_delta:
+            pipe.hset(self._key("user_state", app_name, user_id), mapping={k: self._encode(v) for k, v in user_delta.items()})
+
+    async def _merge_shared_state(self, session: Session) -> Session:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._key("app_state", session.app_name))
+        pipe.hgetall(self._key("user_state", session.app_name, session.user_id))
+        raw_app, raw_user = await pipe.execute()
+        for key, value in self._decode_hash(raw_app).items():
+            session.state[State.APP_PREFIX + key] = value
+        for key, value in self._decode_hash(raw_user).items():
+            session.state[State.USER_PREFIX + key] = value
+        return session
+
+
+def create_session_service() -> BaseSessionService:
+    """Builds the session service selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == "redis":
+        return RedisSessionService()
+    return InMemorySessionService()
+
+
+def sessions_persist_across_workers() -> bool:
+    """True when a session outlives its connection and can be resumed on another worker."""
+    return SESSION_BACKEND == "redis"
@@ -0,0 +1,210 @@
+import os
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from services.redis_cache import acquire_generation_lock, release_generation_lock, is_generation_locked
+
+# The lock must outlive the slowest generation (ADK v2 runs three LLM stages)
+LOCK_TTL_SECONDS = int(os.getenv("PROFILE_LOCK_TTL_SECONDS", "120"))
+# How long a worker waits on another worker's generation before generating itself
+LOCK_WAIT_SECONDS = float(os.getenv("PROFILE_LOCK_WAIT_SECONDS", "90"))
+POLL_INITIAL_SECONDS = 0.25
+POLL_MAX_SECONDS = 2.0
+
+# Also holds the strong reference to background refresh tasks while they run
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Profile generation lock and refresh counters
+_stats = {
+    "lock_acquired": 0,
+    "lock_waits": 0,
+    "lock_wait_hits": 0,
+    "lock_wait_fallbacks": 0,
+    "refreshes_started": 0,
+    "refreshes_failed": 0,
+}
+
+
+# Leader/coalesced counts per key namespace (the part of the key before the first ":"), so profile
+# generation is reported separately from the details, tile, route and intent lookups sharing this module
+_coalescing: Dict[str, Dict[str, int]] = {}
+PROFILE_NAMESPACES = ("profile", "profile_stream")
+
+
+def _record(key: str, outcome: str):
+    namespace = key.split(":", 1)[0]
+    counts = _coalescing.setdefault(namespace, {"leaders": 0, "coalesced": 0})
+    counts[outcome] += 1
+
+
+def _forget(key: str, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Retrieve the outcome so an abandoned failure is not reported as never-retrieved
+    if not task.cancelled():
+        task.exception()
+
+
+async def single_flight(key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+    """Runs `func` once per key in this process; concurrent callers await the same result.
+
+    The work runs as its own task, so a caller disconnecting does not cancel it for the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        _record(key, "leaders")
+        task = asyncio.ensure_future(func())
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget(key, t))
+    else:
+        _record(key, "coalesced")
+    return await asyncio.shield(task)
+
+
+async def generate_once(
+    cache_key: str,
+    generate: Callable[[], Awaitable[Any]],
+    load_result: Callable[[], Awaitable[Optional[Any]]],
+) -> Any:
+    """Runs `generate` on at most one worker per cache key using a Redis lock.
+
+    Workers that lose the lock poll `load_result` (the cache) with backoff until the
+    holder publishes its result. If the holder releases without a result, or the bounded
+    wait expires, the waiter falls back to generating itself.
+    """
+    token = await acquire_generation_lock(cache_key, LOCK_TTL_SECONDS)
+    if token:
+        _stats["lock_acquired"] += 1
+        try:
+            return await generate()
+        finally:
+            await release_generation_lock(cache_key, token)
+
+    _stats["lock_waits"] += 1
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    delay = POLL_INITIAL_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+        result = await load_result()
+        if result is not None:
+            _stats["lock_wait_hits"] += 1
+            return result
+        if not await is_generation_locked(cache_key):
+            # Holder finished without caching (e.g. generation failed); one last look, then take over
+            result = await load_result()
+            if result is not None:
+                _stats["lock_wait_hits"] += 1
+                return result
+            break
+
+    _stats["lock_wait_fallbacks"] += 1
+    return await generate()
+
+
+class _Broadcast:
+    """Items published by one detached producer, replayed in full to every subscriber."""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, item: Any):
+        self.items.append(item)
+        self._notify()
+
+    def _notify(self):
+        # Wakes everyone waiting on the current event; later waiters get a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+_broadcasts: Dict[str, _Broadcast] = {}
+
+
+async def stream_once(key: str, produce: Callable[[Callable[[Any], None]], Awaitable[Any]]) -> AsyncIterator[Any]:
+    """Streaming counterpart of `single_flight`: runs `produce(publish)` once per key as a detached task.
+
+    Every concurrent caller iterates all items published so far and then the rest as they come,
+    and sees the producer's exception, if any, at the end. Subscribers disconnecting never cancel
+    the producer, so whatever it caches at the end is always written.
+    """
+    broadcast = _broadcasts.get(key)
+    if broadcast is None:
+        _record(key, "leaders")
+        broadcast = _Broadcast()
+        _broadcasts[key] = broadcast
+
+        async def run():
+            try:
+                await produce(broadcast.publish)
+            except Exception as e:
+                broadcast.finish(e)
+            else:
+                broadcast.finish()
+            finally:
+                if not broadcast.done:
+                    broadcast.finish(RuntimeError(f"Stream producer for {key} was cancelled"))
+                if _broadcasts.get(key) is broadcast:
+                    del _broadcasts[key]
+                _inflight.pop(f"stream:{key}", None)
+
+        # Held in _inflight so the detached task is strongly referenced until it finishes
+        _inflight[f"stream:{key}"] = asyncio.ensure_future(run())
+    else:
+        _record(key, "coalesced")
+    async for item in broadcast.subscribe():
+        yield item
+
+
+def refresh_in_background(key: str, func: Callable[[], Awaitable[Any]]):
+    """Regenerates a stale entry off the request path; concurrent refreshes for a key collapse into one."""
+    refresh_key = f"refresh:{key}"
+    if refresh_key in _inflight:
+        return
+    _stats["refreshes_started"] += 1
+    task = asyncio.ensure_future(func())
+    _inflight[refresh_key] = task
+
+    def on_done(t: asyncio.Task):
+        _forget(refresh_key, t)
+        if not t.cancelled() and t.exception() is not None:
+            _stats["refreshes_failed"] += 1
+            print(f"Background refresh failed for {key}: {t.exception()}")
+
+    task.add_done_callback(on_done)
+
+
+def get_single_flight_metrics() -> Dict[str, Any]:
+    """Coalescing counters for the metrics endpoint.
+
+    Top-level leaders/coalesced cover profile generation only; `by_namespace` breaks down every caller.
+    """
+    profile = [_coalescing.get(ns, {}) for ns in PROFILE_NAMESPACES]
+    return {
+        "leaders": sum(c.get("leaders", 0) for c in profile),
+        "coalesced": sum(c.get("coalesced", 0) for c in profile),
+        **_stats,
+        "by_namespace": {ns: dict(counts) for ns, counts in _coalescing.items()},
+        "inflight_keys": len(_inflight),
+    }
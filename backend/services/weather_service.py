@@ -1,82 +1,211 @@
-import httpx
-from typing import Dict, Any
+import os
+import time
+import asyncio
+from typing import Dict, Any, List
+
+from services.http_client import get_http_client
+from services.geo import geohash_encode, geohash_center
+from services.redis_cache import register_l1_cache, get_cached_value, set_cached_value
+
+# Weather is effectively identical within a ~5 km geohash cell over a 15 minute window
+WEATHER_GEOHASH_PRECISION = int(os.getenv("WEATHER_GEOHASH_PRECISION", "5"))
+WEATHER_BUCKET_SECONDS = int(os.getenv("WEATHER_BUCKET_SECONDS", "900"))
+# Concurrent lookups arriving within this window share one multi-location Open-Meteo request
+WEATHER_BATCH_WINDOW_SECONDS = float(os.getenv("WEATHER_BATCH_WINDOW_MS", "20")) / 1000
+WEATHER_BATCH_MAX_LOCATIONS = int(os.getenv("WEATHER_BATCH_MAX_LOCATIONS", "50"))
+
+CURRENT_FIELDS = "temperature_2m,relative_humidity_2m,apparent_temperature,is_day,precipitation,rain,showers,snowfall,weather_code,cloud_cover,wind_speed_10m"
+
+register_l1_cache("weather", max_entries=4096, max_bytes=4 * 1024 * 1024)
+
+_pending: Dict[str, asyncio.Future] = {}
+_flush_handle = None
+# Strong references to running flush tasks so they are not garbage-collected mid-flight
+_flush_tasks = set()
+
+_weather_stats = {
+    "lookups": 0,
+    "cache_hits": 0,
+    "coalesced": 0,
+    "upstream_requests": 0,
+    "locations_fetched": 0,
+    "upstream_errors": 0,
+}
+
 
 async def fetch_weather_forecast(lat: float, lng: float) -> Dict[str, Any]:
     """
     Simulates the Google WeatherForecast 2 predictive endpoint by aggregating current atmospheric data.
     Uses open source fallback (Open-Meteo) to generate a high-fidelity weather state for Gemini.
+    Results are shared per geohash cell and time bucket, and cache misses are batched.
     """
-    # Using Open-Meteo as a reliable proxy for raw meteorological data at lat/lng
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lng}&current=temperature_2m,relative_humidity_2m,apparent_temperature,is_day,precipitation,rain,showers,snowfall,weather_code,cloud_cover,wind_speed_10m&temperature_unit=fahrenheit&wind_speed_unit=mph&precipitation_unit=inch"
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, timeout=5.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "current" not in data:
-                return _default_weather()
-                
-            current = data["current"]
-            temp = current.get("temperature_2m", 70)
-            precip = current.get("precipitation", 0.0)
-            snow = current.get("snowfall", 0.0)
-            clouds = current.get("cloud_cover", 0)
-            code = current.get("weather_code", 0)
-            
-            # Translate WMO Weather codes into highly descriptive AI context strings
-            condition = "Clear and pleasant"
-            severe_warning = None
-            render_state = "clear" # For Cesium 3D frontend
-
-            if code in [0, 1]:
-                condition = "Clear skies"
-                render_state = "clear"
-            elif code in [2, 3]:
-                condition = "Partly cloudy to overcast"
-                render_state = "overcast" if clouds > 80 else "clear"
-            elif code in [45, 48]:
-                condition = "Dense fog reducing visibility"
-                render_state = "fog"
-            elif code in [51, 53, 55, 56, 57]:
-                condition = "Light, continuous drizzle"
-                render_state = "rain"
-            elif code in [61, 63, 65, 66, 67]:
-                condition = "Steady moderate-to-heavy rain"
-                render_state = "rain"
-            elif code in [71, 73, 75, 77]:
-                condition = "Falling snow"
-                render_state = "snow"
-            elif code in [80, 81, 82]:
-                condition = "Heavy, sudden rain showers"
-                severe_warning = "Impending heavy downpour"
-                render_state = "heavy_rain"
-            elif code in [85, 86]:
-                condition = "Heavy snow showers"
-                severe_warning = "Incoming blizzard or heavy snow"
-                render_state = "snow"
-            elif code in [95, 96, 99]:
-                condition = "Violent thunderstorm with potential hail"
-                severe_warning = "Severe Thunderstorm Warning"
-                render_state = "heavy_rain"
-
-            # Construct the predictive context block for Gemini
-            ai_prediction_summary = f"{condition} at {temp}°F."
-            if severe_warning:
-                ai_prediction_summary += f" [Google WeatherForecast 2 Anomaly Detected: {severe_warning}]"
-            
-            return {
-                "temperature": temp,
-                "condition": condition,
-                "ai_summary": ai_prediction_summary,
-                "render_state": render_state,
-                "is_day": bool(current.get("is_day", 1))
-            }
+    _weather_stats["lookups"] += 1
+    cell = geohash_encode(lat, lng, WEATHER_GEOHASH_PRECISION)
+    bucket = int(time.time() // WEATHER_BUCKET_SECONDS)
+    cache_key = f"{cell}:{bucket}"
+
+    cached = await get_cached_value("weather", cache_key)
+    if cached:
+        _weather_stats["cache_hits"] += 1
+        return cached
+
+    future = _pending.get(cache_key)
+    if future is None:
+        future = asyncio.get_running_loop().create_future()
+        _pending[cache_key] = future
+        _schedule_flush()
+    else:
+        _weather_stats["coalesced"] += 1
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Weather batch error: {e}")
+        return _default_weather()
+
+
+def _start_flush():
+    task = asyncio.ensure_future(_flush_batch())
+    _flush_tasks.add(task)
+
+    def on_done(t: asyncio.Task):
+        _flush_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            print(f"Weather batch flush failed: {t.exception()}")
+
+    task.add_done_callback(on_done)
+
+
+def _schedule_flush():
+    global _flush_handle
+    if len(_pending) >= WEATHER_BATCH_MAX_LOCATIONS:
+        if _flush_handle is not None:
+            _flush_handle.cancel()
+        _flush_handle = None
+        _start_flush()
+    elif _flush_handle is None:
+        loop = asyncio.get_running_loop()
+        _flush_handle = loop.call_later(WEATHER_BATCH_WINDOW_SECONDS, _start_flush)
+
 
+async def _flush_batch():
+    """Fetches every pending cell in one multi-location Open-Meteo request."""
+    global _flush_handle
+    _flush_handle = None
+    batch = dict(_pending)
+    _pending.clear()
+    if not batch:
+        return
+
+    try:
+        cache_keys = list(batch.keys())
+        centers = [geohash_center(key.split(":")[0]) for key in cache_keys]
+        try:
+            forecasts = await _request_open_meteo(centers)
         except Exception as e:
             print(f"Weather API Error: {e}")
-            return _default_weather()
+            _weather_stats["upstream_errors"] += 1
+            forecasts = []
+        if len(forecasts) != len(cache_keys):
+            # A short (or failed) response leaves the remaining cells on the default weather
+            forecasts = list(forecasts[:len(cache_keys)]) + [None] * (len(cache_keys) - len(forecasts))
+
+        # Entries live until the end of their time bucket
+        ttl_seconds = max(1, int(WEATHER_BUCKET_SECONDS - time.time() % WEATHER_BUCKET_SECONDS))
+        writes = []
+        for key, data in zip(cache_keys, forecasts):
+            weather = _summarize_weather(data) if data else None
+            if weather:
+                writes.append(set_cached_value("weather", key, weather, ttl_seconds))
+            future = batch[key]
+            if not future.done():
+                future.set_result(weather or _default_weather())
+        await asyncio.gather(*writes)
+    finally:
+        # Nothing may be left waiting forever, whatever failed above
+        for future in batch.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Weather batch flush failed"))
+
+
+async def _request_open_meteo(centers: List[tuple]) -> List[Dict[str, Any]]:
+    # Using Open-Meteo as a reliable proxy for raw meteorological data at lat/lng
+    params = {
+        "latitude": ",".join(f"{lat:.5f}" for lat, _ in centers),
+        "longitude": ",".join(f"{lng:.5f}" for _, lng in centers),
+        "current": CURRENT_FIELDS,
+        "temperature_unit": "fahrenheit",
+        "wind_speed_unit": "mph",
+        "precipitation_unit": "inch",
+    }
+    client = get_http_client("weather")
+    _weather_stats["upstream_requests"] += 1
+    _weather_stats["locations_fetched"] += len(centers)
+    response = await client.get("https://api.open-meteo.com/v1/forecast", params=params)
+    response.raise_for_status()
+    data = response.json()
+    # A single location returns an object, several return a list in request order
+    return data if isinstance(data, list) else [data]
+
+
+def _summarize_weather(data: Dict[str, Any]) -> Dict[str, Any]:
+    if "current" not in data:
+        return None
+
+    current = data["current"]
+    temp = current.get("temperature_2m", 70)
+    clouds = current.get("cloud_cover", 0)
+    code = current.get("weather_code", 0)
+
+    # Translate WMO Weather codes into highly descriptive AI context strings
+    condition = "Clear and pleasant"
+    severe_warning = None
+    render_state = "clear" # For Cesium 3D frontend
+
+    if code in [0, 1]:
+        condition = "Clear skies"
+        render_state = "clear"
+    elif code in [2, 3]:
+        condition = "Partly cloudy to overcast"
+        render_state = "overcast" if clouds > 80 else "clear"
+    elif code in [45, 48]:
+        condition = "Dense fog reducing visibility"
+        render_state = "fog"
+    elif code in [51, 53, 55, 56, 57]:
+        condition = "Light, continuous drizzle"
+        render_state = "rain"
+    elif code in [61, 63, 65, 66, 67]:
+        condition = "Steady moderate-to-heavy rain"
+        render_state = "rain"
+    elif code in [71, 73, 75, 77]:
+        condition = "Falling snow"
+        render_state = "snow"
+    elif code in [80, 81, 82]:
+        condition = "Heavy, sudden rain showers"
+        severe_warning = "Impending heavy downpour"
+        render_state = "heavy_rain"
+    elif code in [85, 86]:
+        condition = "Heavy snow showers"
+        severe_warning = "Incoming blizzard or heavy snow"
+        render_state = "snow"
+    elif code in [95, 96, 99]:
+        condition = "Violent thunderstorm with potential hail"
+        severe_warning = "Severe Thunderstorm Warning"
+        render_state = "heavy_rain"
+
+    # Construct the predictive context block for Gemini
+    ai_prediction_summary = f"{condition} at {temp}°F."
+    if severe_warning:
+        ai_prediction_summary += f" [Google WeatherForecast 2 Anomaly Detected: {severe_warning}]"
+
+    return {
+        "temperature": temp,
+        "condition": condition,
+        "ai_summary": ai_prediction_summary,
+        "render_state": render_state,
+        "is_day": bool(current.get("is_day", 1))
+    }
 
 def _default_weather() -> Dict[str, Any]:
     return {
@@ -86,3 +215,7 @@ def _default_weather() -> Dict[str, Any]:
         "render_state": "clear",
         "is_day": True
     }
+
+def get_weather_metrics() -> Dict[str, int]:
+    """Weather lookup, cache and batching counters for the metrics endpoint."""
+    return dict(_weather_stats)
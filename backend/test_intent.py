@@ -0,0 +1,36 @@
+from services.intent_service import canonicalize_intent
+
+
+def test_equivalent_phrasings_share_a_form():
+    assert canonicalize_intent("Quiet parks!") == canonicalize_intent("  find me some QUIET parks ")
+    assert canonicalize_intent("Café") == canonicalize_intent("cafe")
+    assert canonicalize_intent("quiet quiet parks") == "quiet parks"
+
+
+def test_word_order_is_kept():
+    assert canonicalize_intent("coffee, not tea") == "coffee not tea"
+    assert canonicalize_intent("tea, not coffee") == "tea not coffee"
+    assert canonicalize_intent("coffee, not tea") != canonicalize_intent("tea, not coffee")
+
+
+def test_place_nouns_are_kept():
+    assert canonicalize_intent("places to eat") == "places eat"
+
+
+def test_non_latin_intents_are_not_empty():
+    for intent in ["кафе рядом", "カフェ", "咖啡", "ガス"]:
+        assert canonicalize_intent(intent)
+    assert canonicalize_intent("Кафе  рядом!") == canonicalize_intent("кафе рядом")
+    # Dakuten distinguish words in Japanese and are not folded away
+    assert canonicalize_intent("ガス") != canonicalize_intent("カス")
+
+
+def test_emoji_intents_fall_back_to_raw_text():
+    assert canonicalize_intent("☕") == "☕"
+    assert canonicalize_intent(" ☕  🍕 ") == "☕ 🍕"
+    assert canonicalize_intent("☕") != canonicalize_intent("🍕")
+
+
+def test_blank_intent_is_empty():
+    assert canonicalize_intent(None) == ""
+    assert canonicalize_intent("") == ""